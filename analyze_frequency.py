@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Service frequency analytics - departures per hour, headways and gaps.
+
+Computes per-route, per-stop and per-segment (consecutive stop pair)
+frequency histograms for each time band and service day type, from both
+frequencies.txt (headway-based trips) and stop_times.txt (scheduled trips).
+Frequency intervals are expanded with vectorized interval arithmetic, and
+the engine can replace individual trips and re-aggregate only the affected
+routes/stops/segments.
+
+A frequencies.txt trip is placed on stops and segments through its
+stop_times rows, used as a template. Trips without one (all of MTC, which
+publishes no stop_times.txt) only count at the route level, so such a
+system has empty stop and segment statistics and a warning is printed.
+"""
+
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from gtfs_common import iter_csv, parse_gtfs_time
+
+# Paths
+GTFS_BASE = Path(__file__).parent / "GTFS"
+SYSTEMS = {
+    'CMRL': GTFS_BASE / "CMRL",
+    'MTC': GTFS_BASE / "MTC"
+}
+OUTPUT_DIR = Path(__file__).parent / "client" / "public" / "data"
+
+# GTFS service days run past midnight, so hours go up to 29 (05:59 next day)
+HOURS = 30
+
+# Time bands as [start_hour, end_hour)
+TIME_BANDS = [
+    ('night', 0, 5),
+    ('early', 5, 7),
+    ('am_peak', 7, 10),
+    ('midday', 10, 16),
+    ('pm_peak', 16, 20),
+    ('evening', 20, 24),
+    ('after_midnight', 24, HOURS)
+]
+HOUR_BAND = np.zeros(HOURS, dtype=np.int64)
+for _band, (_name, _start, _end) in enumerate(TIME_BANDS):
+    HOUR_BAND[_start:_end] = _band
+
+# A service's weight for a day type is the share of that day type's days it runs on
+DAY_TYPES = {
+    'weekday': ['monday', 'tuesday', 'wednesday', 'thursday', 'friday'],
+    'saturday': ['saturday'],
+    'sunday': ['sunday']
+}
+
+LEVELS = ('route', 'stop', 'segment')
+
+
+def load_service_weights(gtfs_dir):
+    """Map service_id to an array of day-type weights from calendar.txt."""
+    weights = {}
+    for row in iter_csv(gtfs_dir / "calendar.txt"):
+        service_id = row.get('service_id', '')
+        if not service_id:
+            continue
+        weights[service_id] = np.array([
+            sum(row.get(day) == '1' for day in days) / len(days)
+            for days in DAY_TYPES.values()
+        ])
+    return weights
+
+
+class FrequencyEngine:
+    """Departure events and their aggregates for one system.
+
+    Events are kept per level as parallel arrays (trip code, entity code,
+    departure seconds). Histograms and headway gaps are aggregated per
+    entity, so replacing a handful of trips only re-aggregates the entities
+    those trips touch.
+    """
+
+    def __init__(self, service_weights):
+        self.service_weights = service_weights
+        self.trip_codes = {}
+        self.trip_ids = []
+        self.trip_route = []
+        self.trip_weights = np.zeros((0, len(DAY_TYPES)))
+        self.untemplated = set()
+        self.entity_codes = {level: {} for level in LEVELS}
+        self.entity_ids = {level: [] for level in LEVELS}
+        self.events = {level: self._empty_events() for level in LEVELS}
+        self.hist = {level: np.zeros((0, len(DAY_TYPES), HOURS)) for level in LEVELS}
+        self.max_gap = {level: np.zeros((0, len(DAY_TYPES), len(TIME_BANDS))) for level in LEVELS}
+        self.gap_sum = {level: np.zeros((0, len(DAY_TYPES), len(TIME_BANDS))) for level in LEVELS}
+        self.gap_count = {level: np.zeros((0, len(DAY_TYPES), len(TIME_BANDS))) for level in LEVELS}
+
+    @staticmethod
+    def _empty_events():
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+    def _entity(self, level, entity_id):
+        codes = self.entity_codes[level]
+        if entity_id not in codes:
+            codes[entity_id] = len(codes)
+            self.entity_ids[level].append(entity_id)
+        return codes[entity_id]
+
+    def set_trips(self, trips):
+        """Register or update trips from trips.txt rows."""
+        new_weights = []
+        for trip in trips:
+            trip_id = trip.get('trip_id', '')
+            if not trip_id:
+                continue
+            weights = self.service_weights.get(trip.get('service_id', ''), np.ones(len(DAY_TYPES)))
+            route = self._entity('route', trip.get('route_id', ''))
+            if trip_id in self.trip_codes:
+                code = self.trip_codes[trip_id]
+                self.trip_route[code] = route
+                self.trip_weights[code] = weights
+            else:
+                self.trip_codes[trip_id] = len(self.trip_ids)
+                self.trip_ids.append(trip_id)
+                self.trip_route.append(route)
+                new_weights.append(weights)
+        if new_weights:
+            self.trip_weights = np.vstack([self.trip_weights, np.array(new_weights)])
+
+    def _build_events(self, stop_times, frequencies):
+        """Turn stop_times and frequencies rows into per-level event arrays."""
+        # Frequencies: trip code, start, end, headway
+        freq = []
+        for row in frequencies:
+            code = self.trip_codes.get(row.get('trip_id', ''))
+            start, end = parse_gtfs_time(row.get('start_time')), parse_gtfs_time(row.get('end_time'))
+            try:
+                headway = int(row.get('headway_secs', ''))
+            except ValueError:
+                continue
+            if code is None or start is None or end is None or end <= start or headway <= 0:
+                continue
+            freq.append((code, start, end, headway))
+        freq = np.array(freq, dtype=np.int64).reshape(-1, 4)
+        frequency_trips = np.unique(freq[:, 0])
+
+        # Stop times: trip code, stop sequence, stop code, departure
+        st = []
+        for row in stop_times:
+            code = self.trip_codes.get(row.get('trip_id', ''))
+            departure = parse_gtfs_time(row.get('departure_time') or row.get('arrival_time'))
+            if code is None or departure is None:
+                continue
+            try:
+                seq = int(row.get('stop_sequence', ''))
+            except ValueError:
+                continue
+            st.append((code, seq, self._entity('stop', row.get('stop_id', '')), departure))
+        st = np.array(st, dtype=np.int64).reshape(-1, 4)
+        st = st[np.lexsort((st[:, 1], st[:, 0]))]
+        st_trip, st_seq, st_stop, st_dep = st[:, 0], st[:, 1], st[:, 2], st[:, 3]
+
+        first = np.ones(len(st), dtype=bool)
+        first[1:] = st_trip[1:] != st_trip[:-1]
+        trip_start = np.zeros(len(self.trip_ids), dtype=np.int64)
+        trip_start[st_trip[first]] = st_dep[first]
+        offsets = st_dep - trip_start[st_trip]
+
+        # Expand each headway interval into its departures:
+        # start + k * headway for k in [0, ceil((end - start) / headway))
+        counts = -(-(freq[:, 2] - freq[:, 1]) // freq[:, 3])
+        interval = np.repeat(np.arange(len(freq)), counts)
+        k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        run_trip = freq[interval, 0]
+        run_start = freq[interval, 1] + k * freq[interval, 3]
+
+        # Scheduled trips contribute their own stop_times; frequency trips
+        # use theirs as a template shifted to every expanded start, and
+        # without one only reach the route level
+        scheduled = ~np.isin(st_trip, frequency_trips)
+        self.untemplated.update(np.setdiff1d(frequency_trips, st_trip).tolist())
+        trip_route = np.asarray(self.trip_route, dtype=np.int64)
+
+        route_trip = np.concatenate([st_trip[first & scheduled], run_trip])
+        route_time = np.concatenate([st_dep[first & scheduled], run_start])
+        events = {'route': (route_trip, trip_route[route_trip], route_time)}
+
+        tpl_index = np.flatnonzero(~scheduled)
+        tpl_trips, tpl_first = np.unique(st_trip[tpl_index], return_index=True)
+        tpl_begin = np.zeros(len(self.trip_ids), dtype=np.int64)
+        tpl_begin[tpl_trips] = tpl_index[tpl_first]
+        stops_per_trip = np.bincount(st_trip[tpl_index], minlength=len(self.trip_ids))
+        reps = stops_per_trip[run_trip]
+        run_of_event = np.repeat(np.arange(len(run_trip)), reps)
+        pos = np.arange(reps.sum()) - np.repeat(np.cumsum(reps) - reps, reps)
+        tpl_rows = tpl_begin[run_trip[run_of_event]] + pos
+
+        stop_trip = np.concatenate([st_trip[scheduled], run_trip[run_of_event]])
+        stop_code = np.concatenate([st_stop[scheduled], st_stop[tpl_rows]])
+        stop_time = np.concatenate([st_dep[scheduled], run_start[run_of_event] + offsets[tpl_rows]])
+        events['stop'] = (stop_trip, stop_code, stop_time)
+
+        # Segments are consecutive stop pairs within one vehicle run, timed at
+        # the first stop; expanded runs of the same trip are kept apart
+        stop_run = np.concatenate([st_trip[scheduled], len(self.trip_ids) + run_of_event])
+        stop_seq = np.concatenate([st_seq[scheduled], st_seq[tpl_rows]])
+        order = np.lexsort((stop_seq, stop_run))
+        s_run, s_trip, s_stop, s_time = stop_run[order], stop_trip[order], stop_code[order], stop_time[order]
+        same = s_run[1:] == s_run[:-1]
+        pairs = np.stack([s_stop[:-1][same], s_stop[1:][same]], axis=1)
+        unique_pairs, inverse = np.unique(pairs, axis=0, return_inverse=True)
+        stop_ids = self.entity_ids['stop']
+        segment_codes = np.array([self._entity('segment', f"{stop_ids[a]}|{stop_ids[b]}")
+                                  for a, b in unique_pairs], dtype=np.int64)
+        events['segment'] = (s_trip[:-1][same], segment_codes[inverse.reshape(-1)], s_time[:-1][same])
+        return events
+
+    def _aggregate(self, level, entities):
+        """Recompute histograms and headway gaps for the given entity codes."""
+        n = len(self.entity_ids[level])
+        ndays = len(DAY_TYPES)
+        nbands = len(TIME_BANDS)
+        for name, width in (('hist', HOURS), ('max_gap', nbands), ('gap_sum', nbands), ('gap_count', nbands)):
+            table = getattr(self, name)
+            if table[level].shape[0] < n:
+                grown = np.zeros((n, ndays, width))
+                grown[:table[level].shape[0]] = table[level]
+                table[level] = grown
+        hist, max_gap = self.hist[level], self.max_gap[level]
+        gap_sum, gap_count = self.gap_sum[level], self.gap_count[level]
+        for table in (hist, max_gap, gap_sum, gap_count):
+            table[entities] = 0
+
+        trip, ent, t = self.events[level]
+        mask = np.isin(ent, entities)
+        trip, ent, t = trip[mask], ent[mask], t[mask]
+        hour = np.clip(t // 3600, 0, HOURS - 1)
+        weights = self.trip_weights[trip]
+
+        for d in range(ndays):
+            hist[:, d, :] += np.bincount(ent * HOURS + hour, weights=weights[:, d],
+                                         minlength=n * HOURS).reshape(n, HOURS)
+
+            running = weights[:, d] > 0
+            e, tt = ent[running], t[running]
+            order = np.lexsort((tt, e))
+            e, tt = e[order], tt[order]
+            same = e[1:] == e[:-1]
+            gaps = (tt[1:] - tt[:-1])[same]
+            bands = HOUR_BAND[np.clip(tt[1:][same] // 3600, 0, HOURS - 1)]
+            np.maximum.at(max_gap[:, d, :], (e[1:][same], bands), gaps)
+
+            # Average headway only uses gaps between two departures of the
+            # same band, i.e. over the part of the band actually served
+            within = bands == HOUR_BAND[np.clip(tt[:-1][same] // 3600, 0, HOURS - 1)]
+            np.add.at(gap_sum[:, d, :], (e[1:][same][within], bands[within]), gaps[within])
+            np.add.at(gap_count[:, d, :], (e[1:][same][within], bands[within]), 1)
+
+    def load(self, trips, stop_times, frequencies):
+        """Build every level from scratch."""
+        self.set_trips(trips)
+        self.untemplated = set()
+        self.events = self._build_events(stop_times, frequencies)
+        for level in LEVELS:
+            self._aggregate(level, np.arange(len(self.entity_ids[level])))
+
+    def replace_trips(self, trips, stop_times=(), frequencies=()):
+        """Replace the events of the given trips and re-aggregate what they touch.
+
+        trips are trips.txt rows (new or changed); stop_times and frequencies
+        are the complete new rows for those trips. Passing a trip with no
+        stop_times or frequencies removes its service.
+        """
+        trips = list(trips)
+        self.set_trips(trips)
+        codes = np.array([self.trip_codes[t['trip_id']] for t in trips if t.get('trip_id')], dtype=np.int64)
+        self.untemplated.difference_update(codes.tolist())
+        new_events = self._build_events(stop_times, frequencies)
+
+        for level in LEVELS:
+            trip, ent, t = self.events[level]
+            stale = np.isin(trip, codes)
+            n_trip, n_ent, n_t = new_events[level]
+            dirty = np.union1d(ent[stale], n_ent)
+            self.events[level] = (np.concatenate([trip[~stale], n_trip]),
+                                  np.concatenate([ent[~stale], n_ent]),
+                                  np.concatenate([t[~stale], n_t]))
+            self._aggregate(level, dirty)
+
+    def summary(self, level):
+        """Per-entity hourly histograms and per-band statistics.
+
+        band_avg_per_hour spreads the band's departures over its full width;
+        avg_headway_min is the mean gap between consecutive departures within
+        the band (None with fewer than two), and max_gap_min also counts the
+        gap from the previous band's last departure.
+        """
+        result = {}
+        hist, max_gap = self.hist[level], self.max_gap[level]
+        gap_sum, gap_count = self.gap_sum[level], self.gap_count[level]
+        for code, entity_id in enumerate(self.entity_ids[level]):
+            days = {}
+            for d, day_type in enumerate(DAY_TYPES):
+                hourly = hist[code, d]
+                if not hourly.any():
+                    continue
+                bands = {}
+                for b, (band, start, end) in enumerate(TIME_BANDS):
+                    departures = float(hourly[start:end].sum())
+                    if departures <= 0:
+                        continue
+                    bands[band] = {
+                        'departures': round(departures, 2),
+                        'band_avg_per_hour': round(departures / (end - start), 2),
+                        'avg_headway_min': (round(gap_sum[code, d, b] / gap_count[code, d, b] / 60, 1)
+                                            if gap_count[code, d, b] else None),
+                        'max_gap_min': round(max_gap[code, d, b] / 60, 1)
+                    }
+                days[day_type] = {
+                    'hourly': [round(float(v), 2) for v in hourly],
+                    'bands': bands
+                }
+            if days:
+                result[entity_id] = days
+        return result
+
+
+def build_engine(gtfs_dir):
+    """Load a GTFS directory into a FrequencyEngine."""
+    engine = FrequencyEngine(load_service_weights(gtfs_dir))
+    engine.load(iter_csv(gtfs_dir / "trips.txt"),
+                iter_csv(gtfs_dir / "stop_times.txt"),
+                iter_csv(gtfs_dir / "frequencies.txt"))
+    return engine
+
+
+def busiest(summary, band, day_type='weekday', limit=10):
+    """Entities with the most departures per hour in a band."""
+    ranked = []
+    for entity_id, days in summary.items():
+        stats = days.get(day_type, {}).get('bands', {}).get(band)
+        if stats:
+            ranked.append({'id': entity_id, **stats})
+    ranked.sort(key=lambda x: x['band_avg_per_hour'], reverse=True)
+    return ranked[:limit]
+
+
+def generate_frequency_statistics():
+    """Compute service frequency for every system and save the results."""
+    print("=" * 60)
+    print("Service Frequency Analytics")
+    print("=" * 60)
+
+    output = {
+        'time_bands': {name: [start, end] for name, start, end in TIME_BANDS},
+        'day_types': DAY_TYPES,
+        'systems': {}
+    }
+    overview = {}
+
+    for system, gtfs_dir in SYSTEMS.items():
+        if not gtfs_dir.exists():
+            print(f"Warning: {gtfs_dir} not found, skipping {system}")
+            continue
+
+        started = time.perf_counter()
+        engine = build_engine(gtfs_dir)
+        summaries = {f"{level}s": engine.summary(level) for level in LEVELS}
+        elapsed = time.perf_counter() - started
+
+        if engine.untemplated:
+            print(f"  ! {system}: {len(engine.untemplated)} frequency trips have no stop_times template, "
+                  f"counted for routes only (stop and segment statistics exclude them)")
+        output['systems'][system] = summaries
+        overview[system] = {
+            'busiest_routes_am_peak': busiest(summaries['routes'], 'am_peak'),
+            'busiest_routes_pm_peak': busiest(summaries['routes'], 'pm_peak'),
+            'busiest_segments_am_peak': busiest(summaries['segments'], 'am_peak')
+        }
+        counts = ', '.join(f"{len(v)} {k}" for k, v in summaries.items())
+        print(f"✓ {system}: {counts} ({elapsed:.1f}s)")
+
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    output_file = OUTPUT_DIR / "service_frequency.json"
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(output, f)
+    print(f"\n✓ Saved to: {output_file}")
+
+    # Keep a compact overview next to the travel times
+    stats_file = OUTPUT_DIR / "network_statistics.json"
+    if stats_file.exists():
+        with open(stats_file, 'r', encoding='utf-8') as f:
+            statistics = json.load(f)
+        statistics['service_frequency'] = overview
+        with open(stats_file, 'w', encoding='utf-8') as f:
+            json.dump(statistics, f, indent=2)
+        print(f"✓ Updated {stats_file}")
+    print("=" * 60)
+
+    for system, info in overview.items():
+        print(f"\n{system} busiest routes (weekday AM peak):")
+        for route in info['busiest_routes_am_peak'][:5]:
+            print(f"  {route['id']}: {route['band_avg_per_hour']}/h band average, "
+                  f"headway {route['avg_headway_min']} min, max gap {route['max_gap_min']} min")
+
+
+if __name__ == "__main__":
+    generate_frequency_statistics()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic GTFS feed for benchmarking.
+Usage: python benchmarks/generate_synthetic_gtfs.py --preset large --output /tmp/gtfs_large
+
+The feed follows the CMRL file layout (stops, routes, shapes, trips,
+stop_times, fares, transfers) plus an MTC-style frequencies.txt, so every
+script that reads GTFS/CMRL or GTFS/MTC can be pointed at it unchanged.
+Rows are written as they are generated, so millions of stop_times never
+sit in memory at once.
+"""
+
+import argparse
+import csv
+import json
+import math
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from gtfs_common import format_time, haversine_m
+
+# Chennai bounding box used for stop placement
+LAT_MIN, LAT_MAX = 12.80, 13.35
+LON_MIN, LON_MAX = 79.95, 80.35
+
+# Bump whenever the generated rows change, so cached benchmark feeds are rebuilt
+GENERATOR_VERSION = 3
+MANIFEST_FILE = "generator.json"
+
+# Feed sizes: routes x trips_per_route x stops_per_trip = stop_times
+PRESETS = {
+    'small': {'stops': 500, 'routes': 50, 'trips_per_route': 20, 'stops_per_trip': 20},
+    'medium': {'stops': 3000, 'routes': 500, 'trips_per_route': 40, 'stops_per_trip': 25},
+    'large': {'stops': 8000, 'routes': 2000, 'trips_per_route': 50, 'stops_per_trip': 30},
+}
+
+SERVICE_START = 5 * 3600   # 05:00:00
+SERVICE_END = 23 * 3600    # 23:00:00
+DWELL_SECS = 25
+POINTS_PER_SEGMENT = 5
+
+
+def write_rows(filepath, header, rows):
+    """Stream rows into a CSV file and return the number written."""
+    count = 0
+    with open(filepath, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def generate_stops(rng, num_stops):
+    """Scatter stops uniformly over the Chennai bounding box."""
+    stops = []
+    for i in range(num_stops):
+        stops.append({
+            'stop_id': f"S{i:06d}",
+            'stop_name': f"Synthetic Stop {i}",
+            'lat': rng.uniform(LAT_MIN, LAT_MAX),
+            'lon': rng.uniform(LON_MIN, LON_MAX),
+            'zone_id': f"Z{i % 40:02d}"
+        })
+    return stops
+
+
+def pick_route_stops(rng, stops, count):
+    """Pick a spatially coherent stop sequence by walking to nearby stops."""
+    # Sorting a random sample along a random bearing gives a line-like route
+    sample = rng.sample(stops, min(count, len(stops)))
+    bearing = rng.uniform(0, math.pi)
+    dx, dy = math.cos(bearing), math.sin(bearing)
+    sample.sort(key=lambda s: s['lon'] * dx + s['lat'] * dy)
+    return sample
+
+
+def feed_manifest(stops=500, routes=50, trips_per_route=20, stops_per_trip=20, seed=42):
+    """Generator version and parameters that determine a feed's contents."""
+    return {'version': GENERATOR_VERSION, 'seed': seed, 'stops': stops, 'routes': routes,
+            'trips_per_route': trips_per_route, 'stops_per_trip': stops_per_trip}
+
+
+def read_manifest(feed_dir):
+    """The manifest a generated feed was written with, or None."""
+    try:
+        with open(Path(feed_dir) / MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def generate_feed(output_dir, stops=500, routes=50, trips_per_route=20, stops_per_trip=20, seed=42):
+    """Write a complete synthetic GTFS feed into output_dir.
+
+    generator.json is written last, so an interrupted run leaves no manifest.
+    """
+    rng = random.Random(seed)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    print(f"Generating synthetic GTFS feed in {output_dir}...")
+
+    stop_list = generate_stops(rng, stops)
+
+    write_rows(output_dir / "agency.txt",
+               ['agency_id', 'agency_name', 'agency_url', 'agency_timezone', 'agency_lang',
+                'agency_phone', 'agency_email'],
+               [['SYN', 'Synthetic Transit', 'http://example.com/', 'Asia/Kolkata', 'en', '', '']])
+
+    write_rows(output_dir / "calendar.txt",
+               ['service_id', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday',
+                'saturday', 'sunday', 'start_date', 'end_date'],
+               [['WD', 1, 1, 1, 1, 1, 1, 0, '20240101', '20241231'],
+                ['WE', 0, 0, 0, 0, 0, 0, 1, '20240101', '20241231']])
+
+    write_rows(output_dir / "calendar_dates.txt", ['service_id', 'date', 'exception_type'], [])
+
+    n = write_rows(output_dir / "stops.txt",
+                   ['stop_id', 'stop_name', 'stop_desc', 'stop_lat', 'stop_lon', 'zone_id',
+                    'location_type', 'parent_station', 'platform_code'],
+                   ([s['stop_id'], s['stop_name'], '', f"{s['lat']:.8f}", f"{s['lon']:.8f}",
+                     s['zone_id'], 0, s['stop_id'], ''] for s in stop_list))
+    print(f"  ✓ stops.txt: {n} rows")
+
+    # Each route runs in both directions, one shape per direction
+    route_stops = {}
+    route_rows = []
+    for r in range(routes):
+        route_id = f"R{r:05d}"
+        route_stops[route_id] = pick_route_stops(rng, stop_list, stops_per_trip)
+        color = f"{rng.randrange(0x1000000):06X}"
+        route_rows.append([route_id, f"{r}", f"Synthetic Route {r}", '', 3, color, 'FFFFFF'])
+
+    n = write_rows(output_dir / "routes.txt",
+                   ['route_id', 'route_short_name', 'route_long_name', 'route_desc',
+                    'route_type', 'route_color', 'route_text_color'],
+                   route_rows)
+    print(f"  ✓ routes.txt: {n} rows")
+
+    def shape_rows():
+        for route_id, seq_stops in route_stops.items():
+            for direction in (0, 1):
+                shape_id = f"sh{route_id}_{direction}"
+                ordered = seq_stops if direction == 0 else seq_stops[::-1]
+                seq = 1
+                for a, b in zip(ordered, ordered[1:]):
+                    for k in range(POINTS_PER_SEGMENT):
+                        t = k / POINTS_PER_SEGMENT
+                        lat = a['lat'] + (b['lat'] - a['lat']) * t + rng.uniform(-1e-4, 1e-4)
+                        lon = a['lon'] + (b['lon'] - a['lon']) * t + rng.uniform(-1e-4, 1e-4)
+                        yield [shape_id, f"{lat:.8f}", f"{lon:.8f}", seq]
+                        seq += 1
+                last = ordered[-1]
+                yield [shape_id, f"{last['lat']:.8f}", f"{last['lon']:.8f}", seq]
+
+    n = write_rows(output_dir / "shapes.txt",
+                   ['shape_id', 'shape_pt_lat', 'shape_pt_lon', 'shape_pt_sequence'],
+                   shape_rows())
+    print(f"  ✓ shapes.txt: {n} rows")
+
+    # Segment run times are fixed per route so every trip on a route agrees
+    run_times = {}
+    for route_id, seq_stops in route_stops.items():
+        segs = []
+        for a, b in zip(seq_stops, seq_stops[1:]):
+            dist = haversine_m(a['lat'], a['lon'], b['lat'], b['lon'])
+            segs.append(max(60, int(dist / rng.uniform(6.0, 12.0))))
+        # A route zig-zagging across the whole box can outlast the service
+        # day; squeeze it so at least one trip fits between start and end
+        budget = SERVICE_END - SERVICE_START - len(seq_stops) * (DWELL_SECS + 1)
+        if sum(segs) > budget:
+            total = sum(segs)
+            segs = [max(1, seg * budget // total) for seg in segs]
+        run_times[route_id] = segs
+
+    # Trips are spread evenly over the service day; half run each direction.
+    # The last trip starts early enough to reach its final stop by SERVICE_END,
+    # so no time exceeds 24:00:00 (the importer's TIME columns reject that)
+    trips = []
+    last_start = {}
+    for route_id, seq_stops in route_stops.items():
+        run = sum(run_times[route_id]) + len(seq_stops) * DWELL_SECS
+        last_start[route_id] = latest = max(SERVICE_START, SERVICE_END - run)
+        headway = max(60, (latest - SERVICE_START) // max(1, trips_per_route // 2))
+        for t in range(trips_per_route):
+            direction = t % 2
+            start = min(latest, SERVICE_START + (t // 2) * headway + rng.randrange(0, 60))
+            service_id = 'WE' if t % 7 == 6 else 'WD'
+            trips.append((route_id, service_id, f"T{route_id}_{t:04d}", direction, start, headway))
+
+    n = write_rows(output_dir / "trips.txt",
+                   ['route_id', 'service_id', 'trip_id', 'trip_headsign', 'shape_id', 'direction_id'],
+                   ([route_id, service_id, trip_id, f"Synthetic {route_id}",
+                     f"sh{route_id}_{direction}", direction]
+                    for route_id, service_id, trip_id, direction, _, _ in trips))
+    print(f"  ✓ trips.txt: {n} trips")
+
+    def stop_time_rows():
+        for route_id, _, trip_id, direction, start, _ in trips:
+            ordered = route_stops[route_id] if direction == 0 else route_stops[route_id][::-1]
+            segs = run_times[route_id] if direction == 0 else run_times[route_id][::-1]
+            arrival = start
+            for seq, stop in enumerate(ordered, start=1):
+                departure = arrival + DWELL_SECS
+                yield [trip_id, format_time(arrival), format_time(departure), stop['stop_id'], seq]
+                if seq <= len(segs):
+                    arrival = departure + segs[seq - 1]
+
+    n = write_rows(output_dir / "stop_times.txt",
+                   ['trip_id', 'arrival_time', 'departure_time', 'stop_id', 'stop_sequence'],
+                   stop_time_rows())
+    print(f"  ✓ stop_times.txt: {n} rows")
+
+    n = write_rows(output_dir / "frequencies.txt",
+                   ['trip_id', 'start_time', 'end_time', 'headway_secs'],
+                   ([trip_id, format_time(start), format_time(min(start + headway, last_start[route_id] + 1)),
+                     headway]
+                    for route_id, _, trip_id, _, start, headway in trips))
+    print(f"  ✓ frequencies.txt: {n} rows")
+
+    # Zone-to-zone fares in the CMRL fare_rules layout
+    zones = sorted({s['zone_id'] for s in stop_list})
+    write_rows(output_dir / "fare_attributes.txt",
+               ['fare_id', 'price', 'currency_type', 'payment_method', 'transfers', 'transfer_duration'],
+               ([f"F{i}", i * 10, 'INR', 1, '', 7200] for i in range(6)))
+    n = write_rows(output_dir / "fare_rules.txt",
+                   ['fare_id', 'route_id', 'origin_id', 'destination_id'],
+                   ([f"F{min(5, abs(i - j) // 4)}", ' ', o, d]
+                    for i, o in enumerate(zones) for j, d in enumerate(zones)))
+    print(f"  ✓ fare_rules.txt: {n} rows")
+
+    # Transfers between routes that share a stop
+    def transfer_rows():
+        routes_at_stop = {}
+        for route_id, seq_stops in route_stops.items():
+            for stop in seq_stops:
+                routes_at_stop.setdefault(stop['stop_id'], []).append(route_id)
+        for stop_id, served in routes_at_stop.items():
+            for a, b in zip(served, served[1:]):
+                yield [stop_id, stop_id, a, b, 0]
+
+    n = write_rows(output_dir / "transfers.txt",
+                   ['from_stop_id', 'to_stop_id', 'from_route_id', 'to_route_id', 'transfer_type'],
+                   transfer_rows())
+    print(f"  ✓ transfers.txt: {n} rows")
+
+    with open(output_dir / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(feed_manifest(stops, routes, trips_per_route, stops_per_trip, seed), f, indent=2)
+
+    return output_dir
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Generate a synthetic GTFS feed")
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='small')
+    parser.add_argument('--output', type=Path, required=True, help="Directory to write the feed into")
+    parser.add_argument('--stops', type=int)
+    parser.add_argument('--routes', type=int)
+    parser.add_argument('--trips-per-route', type=int)
+    parser.add_argument('--stops-per-trip', type=int)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    params = dict(PRESETS[args.preset])
+    for key in params:
+        value = getattr(args, key)
+        if value is not None:
+            params[key] = value
+
+    print("=" * 60)
+    print(f"Synthetic GTFS Generator ({args.preset})")
+    print("=" * 60)
+    generate_feed(args.output, seed=args.seed, **params)
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Load test for query_server.py.
+Usage: python benchmarks/load_test.py --url http://127.0.0.1:8000 --requests 5000 --concurrency 64
+
+Opens keep-alive connections, replays a random mix of travel-time,
+nearest-stop and departure queries built from /api/stations, and reports
+p50/p90/p99 latency and requests/sec per endpoint and overall.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+MIX = {'travel-time': 0.5, 'nearest-stops': 0.3, 'departures': 0.2}
+
+
+async def request(reader, writer, host, path):
+    """Send one GET over an open connection and return (status, body)."""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode('latin-1'))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+
+def build_queries(stations, count, rng):
+    """Random query paths following MIX."""
+    ids = list(stations)
+    kinds = rng.choices(list(MIX), weights=list(MIX.values()), k=count)
+    queries = []
+    for kind in kinds:
+        hour = rng.randrange(6, 22)
+        at = f"{hour:02d}:{rng.randrange(60):02d}:00"
+        if kind == 'travel-time':
+            origin, destination = rng.sample(ids, 2)
+            params = {'origin': origin, 'destination': destination, 'time': at}
+        elif kind == 'nearest-stops':
+            s = stations[rng.choice(ids)]
+            params = {'lat': s['lat'] + rng.uniform(-0.01, 0.01), 'lon': s['lon'] + rng.uniform(-0.01, 0.01)}
+        else:
+            params = {'stop': rng.choice(ids), 'time': at}
+        queries.append((kind, f"/api/{kind}?{urlencode(params)}"))
+    return queries
+
+
+async def run(args):
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+
+    reader, writer = await asyncio.open_connection(host, port)
+    status, body = await request(reader, writer, host, '/api/stations')
+    writer.close()
+    if status != 200:
+        raise SystemExit(f"✗ /api/stations returned {status}")
+    stations = json.loads(body)
+    if len(stations) < 2:
+        raise SystemExit("✗ Server has fewer than two stations with departures")
+
+    queries = build_queries(stations, args.requests, random.Random(args.seed))
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    next_query = iter(queries)
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for kind, path in next_query:
+                start = time.perf_counter()
+                status, _ = await request(reader, writer, host, path)
+                latencies[kind].append((time.perf_counter() - start) * 1000)
+                # 404 is a valid answer (no journey), anything else is a failure
+                if status not in (200, 404):
+                    errors[kind] += 1
+        finally:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    print("=" * 60)
+    print(f"Load test: {args.requests} requests, {args.concurrency} connections, {elapsed:.2f}s")
+    print("=" * 60)
+    print(f"{'endpoint':<16}{'count':>7}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'mean ms':>9}{'errors':>8}")
+    everything = []
+    for kind, values in sorted(latencies.items()):
+        everything.extend(values)
+        print(f"{kind:<16}{len(values):>7}{percentile(values, 50):>9.1f}{percentile(values, 90):>9.1f}"
+              f"{percentile(values, 99):>9.1f}{statistics.mean(values):>9.1f}{errors[kind]:>8}")
+    print(f"{'all':<16}{len(everything):>7}{percentile(everything, 50):>9.1f}{percentile(everything, 90):>9.1f}"
+          f"{percentile(everything, 99):>9.1f}{statistics.mean(everything):>9.1f}{sum(errors.values()):>8}")
+    print(f"\n✓ {len(everything) / elapsed:.0f} requests/sec")
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Load test the transit query service")
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--seed', type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Timed and memory-profiled benchmarks for the ETL and analytics scripts.
+Usage: python benchmarks/run_benchmarks.py --preset medium [--db]
+
+Each benchmark runs against a synthetic feed (see generate_synthetic_gtfs.py).
+Wall time is measured over several repeats; peak memory is measured in a
+separate tracemalloc run so the tracing overhead does not skew the timings.
+Every run is appended to results/history.jsonl and compared with a pinned
+baseline for the feed (--pin-baseline), or else with the median of the
+last --window runs on the same generated feed, so one noisy run neither
+hides nor fakes a regression. Preset feeds are cached under feeds/ and
+regenerated when their generator.json no longer matches the generator
+version, seed or preset.
+"""
+
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).parent
+REPO_ROOT = BENCH_DIR.parent
+RESULTS_DIR = BENCH_DIR / "results"
+HISTORY_FILE = RESULTS_DIR / "history.jsonl"
+BASELINE_FILE = RESULTS_DIR / "baselines.json"
+FEEDS_DIR = BENCH_DIR / "feeds"
+
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "database"))
+sys.path.insert(0, str(BENCH_DIR))
+
+import analyze_network
+import convert_cmrl
+from generate_synthetic_gtfs import PRESETS, feed_manifest, generate_feed, read_manifest
+
+# Tables emptied before each import benchmark, children first
+IMPORT_TABLES = ['stop_times', 'trips', 'shapes', 'stops', 'routes', 'agency']
+
+
+def git_revision():
+    """Return the current git commit, or 'unknown' outside a checkout."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, text=True,
+            stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_case(func, repeats, setup=None):
+    """Time func over several repeats, then measure its peak memory once."""
+    timings = []
+    for _ in range(repeats):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'median_s': round(statistics.median(timings), 4),
+        'min_s': round(min(timings), 4),
+        'repeats': repeats,
+        'peak_mb': round(peak / (1024 * 1024), 2)
+    }
+
+
+def file_benchmarks(feed_dir, output_dir):
+    """Benchmarks that only need the feed on disk."""
+    # Point the scripts at the synthetic feed instead of GTFS/CMRL
+    analyze_network.GTFS_DIR = feed_dir
+    convert_cmrl.GTFS_DIR = feed_dir
+    convert_cmrl.OUTPUT_DIR = output_dir
+
+    return {
+        'read_csv[stop_times]': (lambda: analyze_network.read_csv(feed_dir / "stop_times.txt"), None),
+        'build_travel_time_matrix': (analyze_network.build_travel_time_matrix, None),
+        'create_cmrl_lines_geojson': (convert_cmrl.create_cmrl_lines_geojson, None),
+    }
+
+
+def import_benchmarks(feed_dir):
+    """Benchmarks for each import_* function; needs a scratch PostGIS database."""
+    import psycopg2
+    import gtfs_to_postgis
+
+    conn = psycopg2.connect(**gtfs_to_postgis.DB_CONFIG)
+
+    def reset():
+        cursor = conn.cursor()
+        cursor.execute(f"TRUNCATE {', '.join(IMPORT_TABLES)} RESTART IDENTITY CASCADE")
+        conn.commit()
+
+    # Later importers depend on rows written by earlier ones
+    order = ['import_agency', 'import_routes', 'import_stops',
+             'import_shapes', 'import_trips', 'import_stop_times']
+    cases = {}
+    for i, name in enumerate(order):
+        prerequisites = [getattr(gtfs_to_postgis, n) for n in order[:i]]
+        target = getattr(gtfs_to_postgis, name)
+
+        def setup(prerequisites=prerequisites):
+            reset()
+            for step in prerequisites:
+                step(conn, 'SYN', feed_dir)
+
+        cases[name] = (lambda target=target: target(conn, 'SYN', feed_dir), setup)
+    return cases, conn
+
+
+def load_history(feed_label, generator):
+    """History records for the same feed, oldest first."""
+    if not HISTORY_FILE.exists():
+        return []
+    history = []
+    with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get('feed') == feed_label and record.get('generator') == generator:
+                history.append(record)
+    return history
+
+
+def rolling_reference(history, window):
+    """Per-benchmark median of each metric over the last window runs."""
+    if not history:
+        return None
+    runs = history[-window:]
+    results = {}
+    for name in {name for record in runs for name in record['results']}:
+        values = [record['results'][name] for record in runs if name in record['results']]
+        results[name] = {metric: round(statistics.median(v[metric] for v in values), 4)
+                         for metric in ('median_s', 'peak_mb')}
+    return {'label': f"median of last {len(runs)} runs", 'results': results}
+
+
+def load_baselines():
+    """Pinned baseline records, keyed by feed label."""
+    if not BASELINE_FILE.exists():
+        return {}
+    with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def pinned_reference(feed_label, generator):
+    """The pinned baseline for a feed, unless it was measured on a different feed version."""
+    record = load_baselines().get(feed_label)
+    if not record or record.get('generator') != generator:
+        return None
+    return {'label': f"baseline pinned at {record['revision']} ({record['timestamp']})",
+            'results': record['results']}
+
+
+def pin_baseline(record):
+    """Store a run as the feed's baseline."""
+    baselines = load_baselines()
+    baselines[record['feed']] = record
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(baselines, f, indent=2)
+
+
+def prepare_feed(preset):
+    """Return the cached feed for a preset, regenerating it if the generator changed."""
+    feed_dir = FEEDS_DIR / preset
+    params = PRESETS[preset]
+    if read_manifest(feed_dir) != feed_manifest(**params):
+        if feed_dir.exists():
+            print(f"Regenerating {feed_dir} (generator version, seed or preset changed)")
+            shutil.rmtree(feed_dir)
+        generate_feed(feed_dir, **params)
+    return feed_dir
+
+
+def compare(current, reference, threshold):
+    """List benchmarks whose median time or peak memory grew beyond threshold."""
+    regressions = []
+    if not reference:
+        return regressions
+    for name, result in current['results'].items():
+        before = reference['results'].get(name)
+        if not before:
+            continue
+        for metric in ('median_s', 'peak_mb'):
+            if before[metric] > 0 and result[metric] > before[metric] * (1 + threshold):
+                regressions.append(
+                    f"{name} {metric}: {before[metric]} -> {result[metric]} "
+                    f"(+{(result[metric] / before[metric] - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main():
+    """Generate (or reuse) a feed, run every benchmark and record the results."""
+    parser = argparse.ArgumentParser(description="Benchmark the GTFS ETL and analytics scripts")
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='small')
+    parser.add_argument('--feed', type=Path, help="Use an existing GTFS directory instead of generating one")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--only', nargs='*', help="Run only the named benchmarks")
+    parser.add_argument('--db', action='store_true',
+                        help="Also benchmark import_* (TRUNCATES the tables in DB_CONFIG)")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Relative slowdown reported as a regression")
+    parser.add_argument('--window', type=int, default=5,
+                        help="Number of previous runs whose median is the reference without a pinned baseline")
+    parser.add_argument('--pin-baseline', action='store_true',
+                        help="Store this run as the baseline that later runs on the feed are compared with")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    parser.add_argument('--no-save', action='store_true', help="Do not append to the history file")
+    args = parser.parse_args()
+
+    if args.feed:
+        feed_dir = args.feed.resolve()
+        feed_label = f"dir:{feed_dir.name}"
+    else:
+        feed_dir = prepare_feed(args.preset)
+        feed_label = f"preset:{args.preset}"
+    generator = read_manifest(feed_dir)
+
+    print("=" * 60)
+    print(f"Benchmarks on {feed_label} ({feed_dir})")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = file_benchmarks(feed_dir, Path(tmp))
+        conn = None
+        if args.db:
+            db_cases, conn = import_benchmarks(feed_dir)
+            cases.update(db_cases)
+
+        results = {}
+        for name, (func, setup) in cases.items():
+            if args.only and name not in args.only:
+                continue
+            print(f"\n▶ {name}")
+            results[name] = run_case(func, args.repeats, setup)
+            r = results[name]
+            print(f"  median {r['median_s']}s, min {r['min_s']}s, peak {r['peak_mb']} MB")
+
+        if conn:
+            conn.close()
+
+    record = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'feed': feed_label,
+        'generator': generator,
+        'results': results
+    }
+
+    reference = (pinned_reference(feed_label, generator)
+                 or rolling_reference(load_history(feed_label, generator), args.window))
+    regressions = compare(record, reference, args.threshold)
+
+    if not args.no_save:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        with open(HISTORY_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"\n✓ Appended results to {HISTORY_FILE}")
+    if args.pin_baseline:
+        pin_baseline(record)
+        print(f"✓ Pinned as the {feed_label} baseline in {BASELINE_FILE}")
+
+    print("=" * 60)
+    if not reference:
+        print("✓ No earlier runs on this feed to compare with")
+    elif regressions:
+        print(f"✗ Regressions against {reference['label']}:")
+        for line in regressions:
+            print(f"  {line}")
+        if args.fail_on_regression:
+            sys.exit(1)
+    else:
+        print(f"✓ No regressions against {reference['label']}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,8 @@ Convert CMRL GTFS data to GeoJSON format for map visualization.
 import csv
 import json
 from pathlib import Path
-from collections import defaultdict
+
+from match_shapes import derive_shape_routes, load_shape_points
 
 # Paths
 GTFS_DIR = Path(__file__).parent / "GTFS" / "CMRL"
@@ -79,75 +80,38 @@ def create_cmrl_stations_geojson():
     return geojson
 
 def create_cmrl_lines_geojson():
-    """Convert CMRL shapes to GeoJSON lines with route colors."""
+    """Convert CMRL shapes to GeoJSON lines coloured by the route each shape serves."""
     print("Processing CMRL metro lines...")
     
     shapes_file = GTFS_DIR / "shapes.txt"
     routes_file = GTFS_DIR / "routes.txt"
     
-    # Read routes to get colors
+    # Join trips -> shapes -> routes to get each shape's route and colour
     routes = read_csv(routes_file)
-    route_info = {}
-    for route in routes:
-        route_id = route.get('route_id', '')
-        route_info[route_id] = {
-            'short_name': route.get('route_short_name', ''),
-            'long_name': route.get('route_long_name', ''),
-            'color': f"#{route.get('route_color', '0054a6')}" if route.get('route_color') else "#0054a6"
-        }
-    
-    # Read shapes
-    shapes = read_csv(shapes_file)
-    
-    # Group shapes by shape_id
-    shape_groups = defaultdict(list)
-    for shape in shapes:
-        shape_id = shape.get('shape_id', '').strip()
-        if not shape_id:
-            continue
-        
-        try:
-            lat = float(shape['shape_pt_lat'])
-            lon = float(shape['shape_pt_lon'])
-            seq = int(shape.get('shape_pt_sequence', 0))
-        except (ValueError, KeyError):
-            continue
-        
-        shape_groups[shape_id].append({
-            'lat': lat,
-            'lon': lon,
-            'seq': seq
-        })
+    trips = read_csv(GTFS_DIR / "trips.txt")
+    stops = read_csv(GTFS_DIR / "stops.txt")
+    shape_points = load_shape_points(read_csv(shapes_file))
+    shape_info = derive_shape_routes(trips, routes, shape_points, stops)
     
     # Create features
     features = []
-    for shape_id, points in shape_groups.items():
-        # Sort by sequence
-        points.sort(key=lambda p: p['seq'])
-        
-        # Create coordinates array
-        coordinates = [[p['lon'], p['lat']] for p in points]
-        
-        # Determine color based on shape_id
-        # Blue line: sh18, sh19
-        # Green line: sh7, sh8, sh13, sh14, sh17, sh20
-        if shape_id in ['sh18', 'sh19']:
-            color = "#000092"  # Blue
-            line_name = "Blue Line (Airport - Wimco Nagar)"
-        else:
-            color = "#00A700"  # Green
-            line_name = "Green Line (St. Thomas Mount - Central/CMBT)"
+    for shape_id, points in shape_points.items():
+        info = shape_info[shape_id]
         
         feature = {
             "type": "Feature",
             "geometry": {
                 "type": "LineString",
-                "coordinates": coordinates
+                "coordinates": points.tolist()
             },
             "properties": {
                 "shape_id": shape_id,
-                "line_name": line_name,
-                "color": color,
+                "route_id": info['route_id'],
+                "route_short_name": info['route_short_name'].strip(),
+                "line_name": info['route_long_name'].strip() or shape_id,
+                "headsign": info['headsign'],
+                "direction_id": info['direction_id'],
+                "color": f"#{info['color']}",
                 "system": "CMRL"
             }
         }
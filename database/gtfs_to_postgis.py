@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 Import GTFS data into PostGIS database.
-Usage: python gtfs_to_postgis.py
+Usage: python gtfs_to_postgis.py [--skip-validation]
 """
 
 import csv
@@ -9,7 +9,10 @@ import psycopg2
 from psycopg2.extras import execute_values
 from pathlib import Path
 import sys
-from collections import defaultdict
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from match_shapes import compute_shape_dist_traveled, derive_shape_routes, load_shape_points, shape_length_km, to_local_km
+from validate_gtfs import REPORT_FILE, in_bbox, print_summary, validate_systems, write_report
 
 # Database configuration
 DB_CONFIG = {
@@ -125,13 +128,16 @@ def import_stops(conn, system, gtfs_dir):
     
     cursor = conn.cursor()
     count = 0
+    skipped = 0
     
     for stop in stops:
         try:
             lat = float(stop.get('stop_lat', 0))
             lon = float(stop.get('stop_lon', 0))
             
-            if lat == 0 or lon == 0:
+            # Unparsable, zero and out-of-region coordinates (see validate_gtfs.BBOX)
+            if not in_bbox(lat, lon):
+                skipped += 1
                 continue
             
             cursor.execute("""
@@ -151,50 +157,46 @@ def import_stops(conn, system, gtfs_dir):
             ))
             count += 1
         except (ValueError, KeyError) as e:
+            skipped += 1
             continue
     
     conn.commit()
-    print(f"    ✓ Imported {count} stops")
+    print(f"    ✓ Imported {count} stops" + (f", skipped {skipped} with invalid or out-of-region coordinates" if skipped else ""))
 
 def import_shapes(conn, system, gtfs_dir):
-    """Import shapes data with PostGIS LineString geometry."""
+    """Import shapes data with PostGIS LineString geometry, route and colour."""
     print(f"  Importing shapes for {system}...")
     
-    shapes = read_csv(gtfs_dir / "shapes.txt")
-    if not shapes:
+    shape_points = load_shape_points(read_csv(gtfs_dir / "shapes.txt"))
+    if not shape_points:
         return
     
-    # Group by shape_id
-    shape_groups = defaultdict(list)
-    for shape in shapes:
-        shape_id = shape.get('shape_id', '').strip()
-        if not shape_id:
-            continue
-        
-        try:
-            lat = float(shape['shape_pt_lat'])
-            lon = float(shape['shape_pt_lon'])
-            seq = int(shape.get('shape_pt_sequence', 0))
-            shape_groups[shape_id].append({'lat': lat, 'lon': lon, 'seq': seq})
-        except (ValueError, KeyError):
-            continue
+    # Derive each shape's route and colour from trips -> routes
+    shape_info = derive_shape_routes(
+        read_csv(gtfs_dir / "trips.txt"),
+        read_csv(gtfs_dir / "routes.txt"),
+        shape_points,
+        read_csv(gtfs_dir / "stops.txt")
+    )
     
     cursor = conn.cursor()
     count = 0
     
-    for shape_id, points in shape_groups.items():
-        # Sort by sequence
-        points.sort(key=lambda p: p['seq'])
+    for shape_id, points in shape_points.items():
+        if len(points) < 2:
+            continue
         
         # Create WKT LineString
-        coords = ', '.join([f"{p['lon']} {p['lat']}" for p in points])
+        coords = ', '.join([f"{lon} {lat}" for lon, lat in points])
         wkt = f"LINESTRING({coords})"
+        info = shape_info[shape_id]
+        length_km = shape_length_km(to_local_km(points, float(points[:, 1].mean())))
         
         cursor.execute("""
-            INSERT INTO shapes (shape_id, geom, system)
-            VALUES (%s, ST_GeomFromText(%s, 4326), %s)
+            INSERT INTO shapes (shape_id, geom, system, route_id, color, length_km)
+            VALUES (%s, ST_GeomFromText(%s, 4326), %s, %s, %s, %s)
             ON CONFLICT (shape_id) DO NOTHING
-        """, (shape_id, wkt, system))
+        """, (shape_id, wkt, system, info['route_id'], info['color'], round(length_km, 2)))
         count += 1
     
     conn.commit()
@@ -237,24 +239,37 @@ def import_stop_times(conn, system, gtfs_dir):
     if not stop_times:
         return
     
+    # Always map-match stops onto shapes: feeds give shape_dist_traveled in
+    # their own units, while the column holds km along the shape
+    shape_dist = compute_shape_dist_traveled(
+        read_csv(gtfs_dir / "trips.txt"),
+        stop_times,
+        read_csv(gtfs_dir / "stops.txt"),
+        load_shape_points(read_csv(gtfs_dir / "shapes.txt"))
+    )
+    
     cursor = conn.cursor()
     batch = []
     
     for st in stop_times:
+        seq = int(st.get('stop_sequence', 0)) if st.get('stop_sequence') else 0
+        dist = shape_dist.get(st.get('trip_id', ''), {}).get(seq)
         batch.append((
             st.get('trip_id', ''),
             st.get('stop_id', ''),
-            int(st.get('stop_sequence', 0)) if st.get('stop_sequence') else 0,
+            seq,
             st.get('arrival_time', None),
             st.get('departure_time', None),
-            st.get('stop_headsign', '')
+            st.get('stop_headsign', ''),
+            dist
         ))
         
         # Batch insert every 1000 records
         if len(batch) >= 1000:
             execute_values(cursor, """
                 INSERT INTO stop_times (trip_id, stop_id, stop_sequence, 
-                                      arrival_time, departure_time, stop_headsign)
+                                      arrival_time, departure_time, stop_headsign,
+                                      shape_dist_traveled)
                 VALUES %s
             """, batch)
             batch = []
@@ -263,7 +278,8 @@ def import_stop_times(conn, system, gtfs_dir):
     if batch:
         execute_values(cursor, """
             INSERT INTO stop_times (trip_id, stop_id, stop_sequence,
-                                  arrival_time, departure_time, stop_headsign)
+                                  arrival_time, departure_time, stop_headsign,
+                                  shape_dist_traveled)
             VALUES %s
         """, batch)
     
@@ -291,6 +307,16 @@ def main():
     print("GTFS to PostGIS Importer")
     print("=" * 60)
     
+    # Validate every feed before anything reaches the database
+    if '--skip-validation' not in sys.argv:
+        present = {system: gtfs_dir for system, gtfs_dir in SYSTEMS.items() if gtfs_dir.exists()}
+        report = validate_systems(present)
+        write_report(report)
+        print_summary(report)
+        if not report['summary']['passed']:
+            print(f"✗ Validation failed, see {REPORT_FILE} (use --skip-validation to import anyway)")
+            sys.exit(1)
+    
     # Connect to database
     conn = connect_db()
     
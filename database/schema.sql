@@ -82,7 +82,8 @@ CREATE TABLE stop_times (
     stop_sequence INTEGER NOT NULL,
     arrival_time TIME,
     departure_time TIME,
-    stop_headsign VARCHAR(255)
+    stop_headsign VARCHAR(255),
+    shape_dist_traveled DECIMAL(10, 3)  -- km along the trip's shape
 );
 
 -- Calendar table
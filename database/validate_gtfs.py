@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Validate GTFS feeds before they are imported into PostGIS.
+Usage: python validate_gtfs.py [--report validation_report.json]
+
+Every file is read exactly once, row by row, in parallel worker processes.
+Only ID sets, small lookups and capped issue samples are kept, so memory is
+bounded by the number of distinct IDs rather than by file size. stop_times
+is scanned last because its speed check needs stop coordinates and route
+types from the other files. Exits non-zero when any error is found.
+"""
+
+import argparse
+import json
+import math
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from gtfs_common import haversine_m, iter_csv, parse_gtfs_time
+
+# GTFS directories
+GTFS_BASE = Path(__file__).parent.parent / "GTFS"
+SYSTEMS = {
+    'CMRL': GTFS_BASE / "CMRL",
+    'MTC': GTFS_BASE / "MTC"
+}
+REPORT_FILE = Path(__file__).parent / "validation_report.json"
+
+# Chennai metropolitan area, including the suburban rail termini
+BBOX = {'lat_min': 12.4, 'lat_max': 13.6, 'lon_min': 79.5, 'lon_max': 80.5}
+
+# Maximum plausible speed (km/h) between consecutive stops, by route_type
+MAX_SPEED_KMH = {0: 80, 1: 100, 2: 130, 3: 80}
+DEFAULT_MAX_SPEED_KMH = 120
+
+# PostgreSQL TIME accepts up to 24:00:00
+MAX_TIME_SECS = 24 * 3600
+
+# Issue samples kept per (file, check); counts are always exact
+MAX_SAMPLES = 20
+
+# Primary keys the importer relies on (ON CONFLICT DO NOTHING drops duplicates)
+PRIMARY_KEYS = {
+    'agency.txt': 'agency_id',
+    'routes.txt': 'route_id',
+    'stops.txt': 'stop_id',
+    'trips.txt': 'trip_id',
+    'calendar.txt': 'service_id',
+    'fare_attributes.txt': 'fare_id'
+}
+
+# (file, field) -> (target file, target ID kind, severity)
+REFERENCES = {
+    ('routes.txt', 'agency_id'): ('agency.txt', 'agency_id', 'warning'),
+    ('stops.txt', 'parent_station'): ('stops.txt', 'stop_id', 'warning'),
+    ('trips.txt', 'route_id'): ('routes.txt', 'route_id', 'error'),
+    ('trips.txt', 'service_id'): ('calendar.txt', 'service_id', 'warning'),
+    ('trips.txt', 'shape_id'): ('shapes.txt', 'shape_id', 'warning'),
+    ('stop_times.txt', 'trip_id'): ('trips.txt', 'trip_id', 'error'),
+    ('stop_times.txt', 'stop_id'): ('stops.txt', 'stop_id', 'error'),
+    ('frequencies.txt', 'trip_id'): ('trips.txt', 'trip_id', 'error'),
+    ('transfers.txt', 'from_stop_id'): ('stops.txt', 'stop_id', 'error'),
+    ('transfers.txt', 'to_stop_id'): ('stops.txt', 'stop_id', 'error'),
+    ('transfers.txt', 'from_route_id'): ('routes.txt', 'route_id', 'warning'),
+    ('transfers.txt', 'to_route_id'): ('routes.txt', 'route_id', 'warning'),
+    ('fare_rules.txt', 'fare_id'): ('fare_attributes.txt', 'fare_id', 'error'),
+    ('fare_rules.txt', 'route_id'): ('routes.txt', 'route_id', 'warning'),
+    ('fare_rules.txt', 'origin_id'): ('stops.txt', 'zone_id', 'warning'),
+    ('fare_rules.txt', 'destination_id'): ('stops.txt', 'zone_id', 'warning'),
+}
+
+
+class Issues:
+    """Issue counts per check, with a capped list of samples."""
+
+    def __init__(self, system, filename):
+        self.system = system
+        self.filename = filename
+        self.counts = defaultdict(int)
+        self.severity = {}
+        self.samples = defaultdict(list)
+
+    def add(self, check, severity, message, row=None, **details):
+        self.counts[check] += 1
+        self.severity[check] = severity
+        if len(self.samples[check]) < MAX_SAMPLES:
+            self.samples[check].append({'row': row, 'message': message, **details})
+
+    def to_list(self):
+        return [{
+            'system': self.system,
+            'file': self.filename,
+            'check': check,
+            'severity': self.severity[check],
+            'count': count,
+            'samples': self.samples[check]
+        } for check, count in self.counts.items()]
+
+
+def in_bbox(lat, lon):
+    """True if (lat, lon) lies inside the Chennai bounding box."""
+    return BBOX['lat_min'] <= lat <= BBOX['lat_max'] and BBOX['lon_min'] <= lon <= BBOX['lon_max']
+
+
+def check_coordinates(issues, row_num, lat_text, lon_text, severity='error', note='', **details):
+    """Validate a lat/lon pair; returns (lat, lon) or None."""
+    try:
+        lat, lon = float(lat_text), float(lon_text)
+    except (TypeError, ValueError):
+        issues.add('invalid_coordinates', severity, f"Unparsable coordinates {lat_text!r}, {lon_text!r}{note}",
+                   row_num, **details)
+        return None
+    if lat == 0 or lon == 0:
+        issues.add('zero_coordinates', severity, f"Coordinates are 0{note}", row_num, **details)
+        return None
+    if not in_bbox(lat, lon):
+        issues.add('outside_bbox', severity, f"({lat}, {lon}) is outside the Chennai bounding box{note}",
+                   row_num, lat=lat, lon=lon, **details)
+    return lat, lon
+
+
+def scan_file(system, gtfs_dir, filename, context=None):
+    """Stream one file, returning its IDs, foreign-key values, lookups and issues."""
+    issues = Issues(system, filename)
+    ids = defaultdict(set)
+    refs = defaultdict(set)
+    lookups = {}
+    rows = 0
+    key = PRIMARY_KEYS.get(filename)
+    ref_fields = [field for (f, field) in REFERENCES if f == filename]
+
+    if filename == 'stops.txt':
+        lookups['coords'] = {}
+    elif filename == 'trips.txt':
+        lookups['trip_route'] = {}
+    elif filename == 'routes.txt':
+        lookups['route_type'] = {}
+
+    # Per-trip / per-shape state; rows are expected grouped by trip or shape
+    current = None
+    seen_groups = set()
+
+    for row_num, row in iter_csv(gtfs_dir / filename, line_numbers=True):
+        rows += 1
+
+        if key:
+            value = row.get(key, '')
+            if not value and key != 'agency_id':
+                issues.add('missing_id', 'error', f"Empty {key}", row_num)
+            elif value in ids[key]:
+                issues.add('duplicate_id', 'error', f"Duplicate {key} {value}", row_num, value=value)
+            ids[key].add(value)
+
+        for field in ref_fields:
+            value = row.get(field, '')
+            if value:
+                refs[field].add(value)
+
+        if filename == 'stops.txt':
+            stop_id = row.get('stop_id', '')
+            # The importer skips these stops, so they only fail validation if something uses them
+            coords = check_coordinates(issues, row_num, row.get('stop_lat'), row.get('stop_lon'), 'warning',
+                                       ', skipped on import', stop_id=stop_id)
+            if coords and in_bbox(*coords):
+                lookups['coords'][stop_id] = coords
+            else:
+                ids['skipped_stop_id'].add(stop_id)
+            if row.get('zone_id'):
+                ids['zone_id'].add(row['zone_id'])
+
+        elif filename == 'routes.txt':
+            try:
+                lookups['route_type'][row.get('route_id', '')] = int(row.get('route_type', ''))
+            except ValueError:
+                issues.add('invalid_value', 'error', f"Invalid route_type {row.get('route_type')!r}",
+                           row_num, route_id=row.get('route_id', ''))
+
+        elif filename == 'trips.txt':
+            lookups['trip_route'][row.get('trip_id', '')] = row.get('route_id', '')
+
+        elif filename in ('calendar.txt', 'calendar_dates.txt'):
+            ids['service_id'].add(row.get('service_id', ''))
+            for field in ('start_date', 'end_date', 'date'):
+                if field in row and not (len(row[field]) == 8 and row[field].isdigit()):
+                    issues.add('invalid_value', 'error', f"Invalid {field} {row[field]!r}", row_num)
+
+        elif filename == 'fare_attributes.txt':
+            try:
+                float(row.get('price', ''))
+            except ValueError:
+                issues.add('invalid_value', 'error', f"Invalid price {row.get('price')!r}", row_num)
+
+        elif filename == 'frequencies.txt':
+            start, end = parse_gtfs_time(row.get('start_time')), parse_gtfs_time(row.get('end_time'))
+            try:
+                headway = int(row.get('headway_secs', ''))
+            except ValueError:
+                headway = 0
+            if start is None or end is None:
+                issues.add('invalid_time', 'error', "Malformed start_time/end_time", row_num,
+                           trip_id=row.get('trip_id', ''))
+            elif end <= start:
+                issues.add('empty_interval', 'error', "end_time is not after start_time", row_num,
+                           trip_id=row.get('trip_id', ''))
+            if headway <= 0:
+                issues.add('invalid_value', 'error', f"Invalid headway_secs {row.get('headway_secs')!r}", row_num,
+                           trip_id=row.get('trip_id', ''))
+
+        elif filename == 'shapes.txt':
+            shape_id = row.get('shape_id', '')
+            ids['shape_id'].add(shape_id)
+            check_coordinates(issues, row_num, row.get('shape_pt_lat'), row.get('shape_pt_lon'), shape_id=shape_id)
+            try:
+                seq = int(row.get('shape_pt_sequence', ''))
+            except ValueError:
+                issues.add('invalid_value', 'error', "Invalid shape_pt_sequence", row_num, shape_id=shape_id)
+                continue
+            if current and current[0] == shape_id:
+                if seq <= current[1]:
+                    issues.add('non_monotonic_sequence', 'error',
+                               f"shape_pt_sequence {seq} after {current[1]}", row_num, shape_id=shape_id)
+            elif shape_id in seen_groups:
+                issues.add('not_grouped', 'warning', f"Points of shape {shape_id} are not contiguous",
+                           row_num, shape_id=shape_id)
+            seen_groups.add(shape_id)
+            current = (shape_id, seq)
+
+        elif filename == 'stop_times.txt':
+            current = check_stop_time(issues, row_num, row, current, seen_groups, context)
+
+    result = {
+        'system': system,
+        'file': filename,
+        'rows': rows,
+        'ids': dict(ids),
+        'refs': dict(refs),
+        'lookups': lookups,
+        'issues': issues.to_list()
+    }
+    return result
+
+
+def check_stop_time(issues, row_num, row, previous, seen_trips, context):
+    """Check one stop_times row against the previous row of the same trip."""
+    trip_id = row.get('trip_id', '')
+    stop_id = row.get('stop_id', '')
+    arrival = parse_gtfs_time(row.get('arrival_time') or row.get('departure_time'))
+    departure = parse_gtfs_time(row.get('departure_time') or row.get('arrival_time'))
+
+    if row.get('arrival_time') or row.get('departure_time'):
+        if arrival is None or departure is None:
+            issues.add('invalid_time', 'error', "Malformed arrival_time/departure_time", row_num, trip_id=trip_id)
+            return previous
+        if max(arrival, departure) > MAX_TIME_SECS:
+            issues.add('time_over_24h', 'error',
+                       f"{row.get('departure_time')} does not fit the TIME column (max 24:00:00)",
+                       row_num, trip_id=trip_id)
+        if departure < arrival:
+            issues.add('departure_before_arrival', 'error', "departure_time is before arrival_time",
+                       row_num, trip_id=trip_id, stop_id=stop_id)
+    try:
+        seq = int(row.get('stop_sequence', ''))
+    except ValueError:
+        issues.add('invalid_value', 'error', "Invalid stop_sequence", row_num, trip_id=trip_id)
+        return previous
+
+    if previous is None or previous['trip_id'] != trip_id:
+        if trip_id in seen_trips:
+            issues.add('not_grouped', 'warning', f"Rows of trip {trip_id} are not contiguous", row_num,
+                       trip_id=trip_id)
+        seen_trips.add(trip_id)
+        return {'trip_id': trip_id, 'seq': seq, 'stop_id': stop_id, 'departure': departure}
+
+    if seq <= previous['seq']:
+        issues.add('non_monotonic_sequence', 'error', f"stop_sequence {seq} after {previous['seq']}",
+                   row_num, trip_id=trip_id)
+
+    if arrival is not None and previous['departure'] is not None:
+        elapsed = arrival - previous['departure']
+        if elapsed < 0:
+            issues.add('negative_travel_time', 'error',
+                       f"Arrives {-elapsed}s before leaving {previous['stop_id']}",
+                       row_num, trip_id=trip_id, from_stop=previous['stop_id'], to_stop=stop_id)
+        elif context:
+            coords = context['coords']
+            a, b = coords.get(previous['stop_id']), coords.get(stop_id)
+            if a and b:
+                km = haversine_m(a[0], a[1], b[0], b[1]) / 1000
+                route_type = context['trip_type'].get(trip_id)
+                limit = MAX_SPEED_KMH.get(route_type, DEFAULT_MAX_SPEED_KMH)
+                speed = km / (elapsed / 3600) if elapsed > 0 else math.inf
+                if km > 0.05 and speed > limit:
+                    issues.add('speed_outlier', 'warning',
+                               f"{km:.2f} km in {elapsed}s ({'inf' if speed == math.inf else round(speed)} km/h)",
+                               row_num, trip_id=trip_id, from_stop=previous['stop_id'], to_stop=stop_id)
+
+    return {'trip_id': trip_id, 'seq': seq, 'stop_id': stop_id, 'departure': departure}
+
+
+def _scan_task(args):
+    return scan_file(*args)
+
+
+def validate_systems(systems=SYSTEMS, workers=None):
+    """Validate every system and return the report dict."""
+    tasks = []
+    for system, gtfs_dir in systems.items():
+        for filepath in sorted(Path(gtfs_dir).glob("*.txt")):
+            if filepath.name != 'stop_times.txt':
+                tasks.append((system, gtfs_dir, filepath.name))
+
+    results = defaultdict(dict)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(_scan_task, tasks):
+            results[result['system']][result['file']] = result
+
+        # stop_times needs coordinates and route types from the first pass
+        second = []
+        for system, gtfs_dir in systems.items():
+            if not (Path(gtfs_dir) / "stop_times.txt").exists():
+                continue
+            files = results[system]
+            route_type = files.get('routes.txt', {}).get('lookups', {}).get('route_type', {})
+            trip_route = files.get('trips.txt', {}).get('lookups', {}).get('trip_route', {})
+            context = {
+                'coords': files.get('stops.txt', {}).get('lookups', {}).get('coords', {}),
+                'trip_type': {t: route_type.get(r) for t, r in trip_route.items()}
+            }
+            second.append((system, gtfs_dir, 'stop_times.txt', context))
+        for result in pool.map(_scan_task, second):
+            results[result['system']][result['file']] = result
+
+    issues = []
+    for system, files in results.items():
+        for result in files.values():
+            issues.extend(result['issues'])
+        issues.extend(check_references(system, files))
+        issues.extend(check_skipped_stops(system, files))
+    issues.extend(check_cross_system_duplicates(results))
+
+    errors = sum(i['count'] for i in issues if i['severity'] == 'error')
+    warnings = sum(i['count'] for i in issues if i['severity'] == 'warning')
+    return {
+        'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'bbox': BBOX,
+        'summary': {'errors': errors, 'warnings': warnings, 'passed': errors == 0},
+        'files': {system: {name: r['rows'] for name, r in sorted(files.items())}
+                  for system, files in results.items()},
+        'issues': issues
+    }
+
+
+def check_references(system, files):
+    """Foreign keys that do not resolve within a system."""
+    issues = []
+    for (filename, field), (target_file, target_key, severity) in REFERENCES.items():
+        if filename not in files:
+            continue
+        values = files[filename]['refs'].get(field, set())
+        if not values:
+            continue
+        targets = set()
+        sources = [target_file]
+        if target_file == 'calendar.txt':
+            sources.append('calendar_dates.txt')
+        for source in sources:
+            targets |= files.get(source, {}).get('ids', {}).get(target_key, set())
+        if not any(s in files for s in sources):
+            issues.append({
+                'system': system, 'file': filename, 'check': 'missing_file', 'severity': severity,
+                'count': 1, 'samples': [{'message': f"{field} is used but {target_file} is missing"}]
+            })
+            continue
+        missing = sorted(values - targets)
+        if missing:
+            issues.append({
+                'system': system, 'file': filename, 'check': f'unknown_{field}', 'severity': severity,
+                'count': len(missing),
+                'samples': [{'message': f"{field} {value!r} not found in {target_file}", 'value': value}
+                            for value in missing[:MAX_SAMPLES]]
+            })
+    return issues
+
+
+def check_skipped_stops(system, files):
+    """Stop times and transfers at stops the importer skips for their coordinates."""
+    issues = []
+    skipped = files.get('stops.txt', {}).get('ids', {}).get('skipped_stop_id', set())
+    if not skipped:
+        return issues
+    for filename, fields in (('stop_times.txt', ('stop_id',)), ('transfers.txt', ('from_stop_id', 'to_stop_id'))):
+        used = set()
+        for field in fields:
+            used |= files.get(filename, {}).get('refs', {}).get(field, set()) & skipped
+        if used:
+            used = sorted(used)
+            issues.append({
+                'system': system, 'file': filename, 'check': 'skipped_stop_referenced', 'severity': 'error',
+                'count': len(used),
+                'samples': [{'message': f"stop_id {value!r} has invalid or out-of-region coordinates", 'value': value}
+                            for value in used[:MAX_SAMPLES]]
+            })
+    return issues
+
+
+def check_cross_system_duplicates(results):
+    """IDs that appear in more than one system (PostGIS keys are global)."""
+    issues = []
+    for filename, key in PRIMARY_KEYS.items():
+        owners = defaultdict(list)
+        for system, files in results.items():
+            for value in files.get(filename, {}).get('ids', {}).get(key, set()):
+                if value:
+                    owners[value].append(system)
+        shared = sorted(v for v, systems in owners.items() if len(systems) > 1)
+        if shared:
+            issues.append({
+                'system': '*', 'file': filename, 'check': 'duplicate_id_across_systems', 'severity': 'error',
+                'count': len(shared),
+                'samples': [{'message': f"{key} {value!r} used by {', '.join(owners[value])}", 'value': value}
+                            for value in shared[:MAX_SAMPLES]]
+            })
+    return issues
+
+
+def write_report(report, report_file=REPORT_FILE):
+    """Write the report as JSON."""
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+
+def print_summary(report):
+    """Print one line per failing check."""
+    for issue in sorted(report['issues'], key=lambda i: (i['severity'], i['system'], i['file'])):
+        marker = '✗' if issue['severity'] == 'error' else '!'
+        sample = issue['samples'][0]['message'] if issue['samples'] else ''
+        print(f"  {marker} {issue['system']}/{issue['file']} {issue['check']}: {issue['count']} ({sample})")
+    summary = report['summary']
+    print(f"\n{'✓' if summary['passed'] else '✗'} {summary['errors']} errors, {summary['warnings']} warnings")
+
+
+def main():
+    """Validate all systems and exit non-zero on errors."""
+    parser = argparse.ArgumentParser(description="Validate GTFS feeds")
+    parser.add_argument('--report', type=Path, default=REPORT_FILE)
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("GTFS Validator")
+    print("=" * 60)
+    report = validate_systems(workers=args.workers)
+    write_report(report, args.report)
+    print_summary(report)
+    print(f"✓ Report written to {args.report}")
+    print("=" * 60)
+    sys.exit(0 if report['summary']['passed'] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Export the normalized multi-system network as partitioned Parquet/GeoParquet.
+Usage: python export_parquet.py
+
+Writes one dataset per table under data/parquet/<table>/system=<SYSTEM>/,
+so DuckDB or pyarrow can read a single column across every system:
+
+    SELECT system, count(*) FROM read_parquet('data/parquet/stop_times/*/*.parquet',
+                                              hive_partitioning = 1) GROUP BY system;
+
+IDs are dictionary-encoded strings, GTFS times are int32 seconds since
+midnight (values past 24:00:00 are kept), and stops/shapes carry a WKB
+geometry column with GeoParquet metadata. Files are written one row group
+at a time, so no table is ever fully materialized in memory.
+"""
+
+import json
+import sqlite3
+import struct
+from itertools import islice
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from gtfs_common import iter_csv, parse_gtfs_time
+
+# Paths
+GTFS_BASE = Path(__file__).parent / "GTFS"
+SYSTEMS = {
+    'CMRL': GTFS_BASE / "CMRL",
+    'MTC': GTFS_BASE / "MTC"
+}
+SR_GPKG = GTFS_BASE / "RAIL" / "sr_transit_warehouse.gpkg"
+OUTPUT_DIR = Path(__file__).parent / "data" / "parquet"
+
+ROW_GROUP_SIZE = 100_000
+
+# Column kinds map to Arrow types; 'id' columns are dictionary-encoded
+ARROW_TYPES = {
+    'id': pa.dictionary(pa.int32(), pa.string()),
+    'str': pa.string(),
+    'int': pa.int32(),
+    'float': pa.float64(),
+    'time': pa.int32(),
+    'geometry': pa.binary()
+}
+
+# Normalized table layouts shared by every system
+TABLES = {
+    'stops': [('stop_id', 'id'), ('stop_name', 'str'), ('stop_lat', 'float'), ('stop_lon', 'float'),
+              ('zone_id', 'id'), ('parent_station', 'id'), ('location_type', 'int'),
+              ('geometry', 'geometry')],
+    'routes': [('route_id', 'id'), ('agency_id', 'id'), ('route_short_name', 'str'),
+               ('route_long_name', 'str'), ('route_type', 'int'), ('route_color', 'str'),
+               ('route_text_color', 'str')],
+    'trips': [('trip_id', 'id'), ('route_id', 'id'), ('service_id', 'id'), ('trip_headsign', 'str'),
+              ('shape_id', 'id'), ('direction_id', 'int')],
+    'stop_times': [('trip_id', 'id'), ('stop_id', 'id'), ('stop_sequence', 'int'),
+                   ('arrival_time', 'time'), ('departure_time', 'time')],
+    'frequencies': [('trip_id', 'id'), ('start_time', 'time'), ('end_time', 'time'),
+                    ('headway_secs', 'int')],
+    'shapes': [('shape_id', 'id'), ('num_points', 'int'), ('geometry', 'geometry')],
+    'transfers': [('from_stop_id', 'id'), ('to_stop_id', 'id'), ('from_route_id', 'id'),
+                  ('to_route_id', 'id'), ('transfer_type', 'int'), ('min_transfer_time', 'int')],
+    'fare_attributes': [('fare_id', 'id'), ('price', 'float'), ('currency_type', 'id'),
+                        ('payment_method', 'int'), ('transfers', 'int'), ('transfer_duration', 'int')],
+    'fare_rules': [('fare_id', 'id'), ('route_id', 'id'), ('origin_id', 'id'), ('destination_id', 'id')]
+}
+
+# GeoParquet geometry types per table (empty list means "any")
+GEOMETRY_TYPES = {
+    'stops': ['Point'],
+    'shapes': ['LineString']
+}
+
+
+def parse_int(value):
+    """Convert a string to int, or None when empty/invalid."""
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def parse_float(value):
+    """Convert a string to float, or None when empty/invalid."""
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+CONVERTERS = {
+    'id': lambda v: v or None,
+    'str': lambda v: v,
+    'int': parse_int,
+    'float': parse_float,
+    'time': parse_gtfs_time,
+    'geometry': lambda v: v
+}
+
+
+def point_wkb(lon, lat):
+    """Little-endian WKB for a 2D point."""
+    return struct.pack('<BIdd', 1, 1, lon, lat)
+
+
+def linestring_wkb(coords):
+    """Little-endian WKB for a 2D LineString."""
+    return struct.pack('<BII', 1, 2, len(coords)) + b''.join(struct.pack('<dd', x, y) for x, y in coords)
+
+
+def gpkg_to_wkb(blob):
+    """Strip the GeoPackage binary header and return the plain WKB body."""
+    flags = blob[3]
+    envelope_size = {0: 0, 1: 32, 2: 48, 3: 48, 4: 64}[(flags >> 1) & 0x07]
+    return bytes(blob[8 + envelope_size:])
+
+
+def table_schema(table):
+    """Arrow schema for a normalized table, with GeoParquet metadata if spatial."""
+    fields = [pa.field(name, ARROW_TYPES[kind]) for name, kind in TABLES[table]]
+    metadata = None
+    if table in GEOMETRY_TYPES:
+        metadata = {b'geo': json.dumps({
+            'version': '1.0.0',
+            'primary_column': 'geometry',
+            'columns': {'geometry': {'encoding': 'WKB', 'geometry_types': GEOMETRY_TYPES[table]}}
+        }).encode('utf-8')}
+    return pa.schema(fields, metadata=metadata)
+
+
+def rows_to_batch(rows, table, schema):
+    """Convert a list of raw row dicts into a RecordBatch."""
+    arrays = []
+    for name, kind in TABLES[table]:
+        convert = CONVERTERS[kind]
+        values = [convert(row.get(name)) for row in rows]
+        if kind == 'id':
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, type=ARROW_TYPES[kind]))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_table(table, system, rows, geometry_types=None):
+    """Stream rows into data/parquet/<table>/system=<system>/part-0.parquet."""
+    schema = table_schema(table)
+    if geometry_types is not None and table in GEOMETRY_TYPES:
+        geo = json.loads(schema.metadata[b'geo'])
+        geo['columns']['geometry']['geometry_types'] = geometry_types
+        schema = schema.with_metadata({b'geo': json.dumps(geo).encode('utf-8')})
+
+    out_dir = OUTPUT_DIR / table / f"system={system}"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    output_file = out_dir / "part-0.parquet"
+
+    rows = iter(rows)
+    count = 0
+    with pq.ParquetWriter(output_file, schema, compression='zstd') as writer:
+        while True:
+            chunk = list(islice(rows, ROW_GROUP_SIZE))
+            if not chunk:
+                break
+            writer.write_batch(rows_to_batch(chunk, table, schema))
+            count += len(chunk)
+
+    print(f"    ✓ {table}: {count} rows")
+    return count
+
+
+def iter_stops(gtfs_dir):
+    """GTFS stops with a point geometry; rows without coordinates keep a null geometry."""
+    for stop in iter_csv(gtfs_dir / "stops.txt"):
+        lat = parse_float(stop.get('stop_lat'))
+        lon = parse_float(stop.get('stop_lon'))
+        stop['geometry'] = point_wkb(lon, lat) if lat is not None and lon is not None else None
+        yield stop
+
+
+def shapes_grouped(filepath):
+    """True if every shape's points are contiguous in shapes.txt."""
+    seen = set()
+    current_id = None
+    for row in iter_csv(filepath):
+        shape_id = row.get('shape_id', '')
+        if shape_id != current_id:
+            if shape_id in seen:
+                return False
+            seen.add(shape_id)
+            current_id = shape_id
+    return True
+
+
+def shape_record(shape_id, points):
+    """One shapes row from (sequence, lon, lat) points."""
+    points.sort(key=lambda p: p[0])
+    return {
+        'shape_id': shape_id,
+        'num_points': str(len(points)),
+        'geometry': linestring_wkb([(lon, lat) for _, lon, lat in points])
+    }
+
+
+def iter_shape_points(filepath):
+    """Yield (shape_id, (sequence, lon, lat)) for every usable point."""
+    for row in iter_csv(filepath):
+        shape_id = row.get('shape_id', '')
+        lat = parse_float(row.get('shape_pt_lat'))
+        lon = parse_float(row.get('shape_pt_lon'))
+        if shape_id and lat is not None and lon is not None:
+            yield shape_id, (parse_int(row.get('shape_pt_sequence')) or 0, lon, lat)
+
+
+def iter_shapes(gtfs_dir):
+    """Collapse shapes.txt into one LineString per shape_id.
+
+    Points are normally grouped by shape_id (as every producer writes
+    them), so only the shape currently being read is held in memory. If a
+    first pass over the shape_ids finds a shape split across the file, the
+    whole file is grouped in memory instead.
+    """
+    filepath = gtfs_dir / "shapes.txt"
+    if not shapes_grouped(filepath):
+        print("    Warning: shapes.txt is not grouped by shape_id, grouping it in memory")
+        shapes = {}
+        for shape_id, point in iter_shape_points(filepath):
+            shapes.setdefault(shape_id, []).append(point)
+        for shape_id, points in shapes.items():
+            yield shape_record(shape_id, points)
+        return
+
+    current_id = None
+    points = []
+    for shape_id, point in iter_shape_points(filepath):
+        if shape_id != current_id:
+            if current_id is not None:
+                yield shape_record(current_id, points)
+            current_id = shape_id
+            points = []
+        points.append(point)
+
+    if current_id is not None:
+        yield shape_record(current_id, points)
+
+
+def export_gtfs_system(system, gtfs_dir):
+    """Export every normalized table of a GTFS feed."""
+    print(f"  Exporting {system} from {gtfs_dir}...")
+    sources = {'stops': iter_stops, 'shapes': iter_shapes}
+    for table in TABLES:
+        if not (gtfs_dir / f"{table}.txt").exists():
+            print(f"    Warning: {table}.txt not found, skipping...")
+            continue
+        rows = sources[table](gtfs_dir) if table in sources else iter_csv(gtfs_dir / f"{table}.txt")
+        write_table(table, system, rows)
+
+
+def export_sr(gpkg_path):
+    """Export the suburban rail warehouse (stations, corridors, routes)."""
+    print(f"  Exporting SR from {gpkg_path}...")
+    conn = sqlite3.connect(gpkg_path)
+    conn.row_factory = sqlite3.Row
+
+    def stations():
+        for row in conn.execute("SELECT stop_id, stop_name, geom FROM rail_stations"):
+            geometry = gpkg_to_wkb(row['geom']) if row['geom'] else None
+            lon = lat = None
+            if geometry and len(geometry) == 21:
+                lon, lat = struct.unpack('<dd' if geometry[0] == 1 else '>dd', geometry[5:21])
+            yield {
+                'stop_id': row['stop_id'],
+                'stop_name': row['stop_name'],
+                'stop_lat': str(lat) if lat is not None else '',
+                'stop_lon': str(lon) if lon is not None else '',
+                'geometry': geometry
+            }
+
+    def corridors():
+        for row in conn.execute("SELECT fid, geom FROM rail_corridors"):
+            yield {
+                'shape_id': f"SR_corridor_{row['fid']}",
+                'geometry': gpkg_to_wkb(row['geom']) if row['geom'] else None
+            }
+
+    def routes():
+        for row in conn.execute("SELECT route_id, route_long_name, agency_id FROM routes"):
+            yield {'route_id': row['route_id'], 'route_long_name': row['route_long_name'],
+                   'agency_id': row['agency_id'], 'route_type': '2'}
+
+    write_table('stops', 'SR', stations())
+    # Corridors are LineStrings or MultiLineStrings depending on the source
+    write_table('shapes', 'SR', corridors(), geometry_types=[])
+    write_table('routes', 'SR', routes())
+    conn.close()
+
+
+def main():
+    """Main export function."""
+    print("=" * 60)
+    print("Network to Parquet Exporter")
+    print("=" * 60)
+
+    for system, gtfs_dir in SYSTEMS.items():
+        if gtfs_dir.exists():
+            export_gtfs_system(system, gtfs_dir)
+        else:
+            print(f"Warning: {gtfs_dir} not found, skipping {system}")
+
+    if SR_GPKG.exists():
+        export_sr(SR_GPKG)
+    else:
+        print(f"Warning: {SR_GPKG} not found, skipping SR")
+
+    print("=" * 60)
+    print("✓ Export complete!")
+    print(f"Output directory: {OUTPUT_DIR}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
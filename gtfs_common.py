@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Helpers shared by the GTFS scripts: whitespace-tolerant CSV reading, time
+parsing, distances, the stop registry that resolves stop ids, station ids,
+station codes and names across systems, and service calendars.
+
+The feeds pad fields with spaces (MTC), use CRLF line endings and blank
+lines (CMRL), and may start with a UTF-8 BOM, so every reader goes through
+iter_csv.
+"""
+
+import csv
+import math
+import sqlite3
+import struct
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+GTFS_BASE = Path(__file__).parent / "GTFS"
+SR_GPKG = GTFS_BASE / "RAIL" / "sr_transit_warehouse.gpkg"
+
+TIMEZONE = ZoneInfo("Asia/Kolkata")
+TRANSFER_SECS = 180  # change between stops of the same station
+
+
+def iter_csv(filepath, line_numbers=False):
+    """Yield rows of a CSV file with whitespace stripped from keys and values.
+
+    Blank rows are skipped. With line_numbers, yields (line_number, row)
+    where line 1 is the header. A missing file yields nothing.
+    """
+    filepath = Path(filepath)
+    if not filepath.exists():
+        return
+    with open(filepath, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.DictReader(f)
+        reader.fieldnames = [name.strip() for name in reader.fieldnames or []]
+        for row in reader:
+            if not any(v and v.strip() for v in row.values() if isinstance(v, str)):
+                continue
+            row = {k: (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k}
+            yield (reader.line_num, row) if line_numbers else row
+
+
+def read_csv(filepath):
+    """Read a whole CSV file with iter_csv; [] if it does not exist."""
+    return list(iter_csv(filepath))
+
+
+def parse_time(value):
+    """Convert HH:MM[:SS] to seconds since midnight; raises ValueError.
+
+    Hours may exceed 23 (GTFS service days run past midnight), but minutes
+    and seconds must be 0-59.
+    """
+    parts = str(value).split(':')
+    if len(parts) not in (2, 3):
+        raise ValueError(value)
+    h, m = int(parts[0]), int(parts[1])
+    s = int(parts[2]) if len(parts) == 3 else 0
+    if h < 0 or not 0 <= m <= 59 or not 0 <= s <= 59:
+        raise ValueError(value)
+    return h * 3600 + m * 60 + s
+
+
+def parse_gtfs_time(value):
+    """Convert a GTFS HH:MM:SS field to seconds since midnight, or None if malformed."""
+    if not isinstance(value, str) or value.count(':') != 2:
+        return None
+    try:
+        return parse_time(value)
+    except ValueError:
+        return None
+
+
+def format_time(seconds):
+    """Format seconds since midnight as HH:MM:SS (hours may exceed 24)."""
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((p2 - p1) / 2) ** 2
+         + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * 6371000 * math.asin(math.sqrt(a))
+
+
+def load_sr_stops(gpkg_path=SR_GPKG):
+    """Suburban rail stations from the GeoPackage warehouse, as stops.txt rows."""
+    stops = []
+    if not Path(gpkg_path).exists():
+        return stops
+    conn = sqlite3.connect(gpkg_path)
+    for stop_id, name, blob in conn.execute("SELECT stop_id, stop_name, geom FROM rail_stations"):
+        if not stop_id or not blob:
+            continue
+        # GeoPackage header, then a WKB point
+        envelope = {0: 0, 1: 32, 2: 48, 3: 48, 4: 64}[(blob[3] >> 1) & 0x07]
+        wkb = blob[8 + envelope:]
+        lon, lat = struct.unpack('<dd' if wkb[0] == 1 else '>dd', wkb[5:21])
+        stops.append({'stop_id': f"SR_{stop_id}", 'stop_name': name, 'stop_lat': lat, 'stop_lon': lon,
+                      'parent_station': '', 'zone_id': stop_id})
+    conn.close()
+    return stops
+
+
+class StopRegistry:
+    """Stops of several systems indexed 0..n-1, grouped into stations.
+
+    A stop can be looked up by its stop_id, its parent station id, its
+    name, or the station code that CMRL station rows carry in zone_id
+    (e.g. SCC).
+    """
+
+    def __init__(self):
+        self.stop_ids = []
+        self.stop_names = []
+        self.stop_coords = []
+        self.stop_system = []
+        self.stop_zone = []
+        self.stop_index = {}
+        self.aliases = defaultdict(set)
+        self.siblings = {}
+
+    def add_stops(self, system, stops):
+        """Register stops and their station aliases; returns [(index, row)] of new stops."""
+        children = defaultdict(set)
+        added = []
+        for stop in stops:
+            stop_id = stop.get('stop_id', '')
+            if not stop_id or stop_id in self.stop_index:
+                continue
+            try:
+                coords = (float(stop['stop_lat']), float(stop['stop_lon']))
+                if coords[0] == 0 or coords[1] == 0:
+                    coords = None
+            except (KeyError, TypeError, ValueError):
+                coords = None
+            idx = len(self.stop_ids)
+            self.stop_index[stop_id] = idx
+            self.stop_ids.append(stop_id)
+            self.stop_names.append(stop.get('stop_name', ''))
+            self.stop_coords.append(coords)
+            self.stop_system.append(system)
+            self.stop_zone.append(stop.get('zone_id', ''))
+            children[stop.get('parent_station') or stop_id].add(idx)
+            added.append((idx, stop))
+
+        for idx, stop in added:
+            group = children[stop.get('parent_station') or stop['stop_id']]
+            self.siblings[idx] = tuple(s for s in group if s != idx)
+            for key in (stop['stop_id'], stop.get('parent_station'), stop.get('stop_name')):
+                if key:
+                    self.aliases[key.upper()] |= group
+            if stop.get('location_type') == '1' and stop.get('zone_id'):
+                self.aliases[stop['zone_id'].upper()] |= group
+        return added
+
+    def resolve(self, key):
+        """Stop indexes for a stop_id, station id, station code or name; raises KeyError."""
+        stops = self.aliases.get(str(key or '').strip().upper())
+        if not stops:
+            raise KeyError(f"Unknown stop or station: {key}")
+        return stops
+
+
+def today():
+    """Today's date in Chennai."""
+    return datetime.now(TIMEZONE).date()
+
+
+def parse_date(value):
+    """Convert a GTFS YYYYMMDD or ISO YYYY-MM-DD date; raises ValueError."""
+    value = str(value).strip()
+    return datetime.strptime(value, '%Y-%m-%d' if '-' in value else '%Y%m%d').date()
+
+
+class ServiceCalendar:
+    """Which service_ids of one feed run on a date.
+
+    calendar.txt gives weekly patterns within a date range and
+    calendar_dates.txt adds (exception_type 1) or removes (2) services on
+    single dates. If a date lies outside the range of every weekly pattern
+    (the feed has expired or not started yet), the ranges are ignored and
+    the weekly patterns still apply, so an out-of-date feed keeps answering
+    with its usual week; check covers() to warn about it.
+    """
+
+    WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+    def __init__(self, calendar, calendar_dates):
+        self.weekly = {}
+        for row in calendar:
+            try:
+                days = tuple(row.get(day) == '1' for day in self.WEEKDAYS)
+                self.weekly[row['service_id']] = (days, parse_date(row['start_date']),
+                                                  parse_date(row['end_date']))
+            except (KeyError, ValueError):
+                continue
+        self.exceptions = defaultdict(dict)
+        for row in calendar_dates:
+            try:
+                self.exceptions[parse_date(row['date'])][row['service_id']] = row.get('exception_type') == '1'
+            except (KeyError, ValueError):
+                continue
+        self.service_ids = set(self.weekly) | {s for day in self.exceptions.values() for s in day}
+
+    @classmethod
+    def from_dir(cls, gtfs_dir):
+        gtfs_dir = Path(gtfs_dir)
+        return cls(iter_csv(gtfs_dir / "calendar.txt"), iter_csv(gtfs_dir / "calendar_dates.txt"))
+
+    def covers(self, service_date):
+        """True if service_date is inside at least one weekly pattern's range."""
+        return any(start <= service_date <= end for _, start, end in self.weekly.values())
+
+    def active(self, service_date):
+        """Set of service_ids running on service_date."""
+        in_range = self.covers(service_date) or not self.weekly
+        running = {service_id for service_id, (days, start, end) in self.weekly.items()
+                   if days[service_date.weekday()] and (not in_range or start <= service_date <= end)}
+        for service_id, added in self.exceptions.get(service_date, {}).items():
+            if added:
+                running.add(service_id)
+            else:
+                running.discard(service_id)
+        return running
+
+
+class TripServices:
+    """Service of every trip of a compiled network, across systems.
+
+    Trips are numbered in the order add_trip is called, which must match
+    the network's own trip numbering. Systems without calendar files run
+    every trip every day.
+    """
+
+    def __init__(self):
+        self.calendars = {}
+        self.trip_service = []
+        self._running = {}
+
+    def load_calendar(self, system, gtfs_dir):
+        """Read a system's calendar files; returns the ServiceCalendar or None."""
+        calendar = ServiceCalendar.from_dir(gtfs_dir)
+        if calendar.service_ids:
+            self.calendars[system] = calendar
+            return calendar
+        return None
+
+    def add_trip(self, system, service_id):
+        self.trip_service.append((system, service_id))
+        return len(self.trip_service) - 1
+
+    def running(self, service_date=None):
+        """Tuple of booleans, indexed by trip number: does the trip run on service_date (default today)."""
+        service_date = service_date or today()
+        if service_date not in self._running:
+            active = {system: calendar.active(service_date) for system, calendar in self.calendars.items()}
+            if len(self._running) > 32:
+                self._running.clear()
+            self._running[service_date] = tuple(
+                system not in active or service_id in active[system]
+                for system, service_id in self.trip_service)
+        return self._running[service_date]
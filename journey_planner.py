@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+"""
+Multi-criteria journey planner (McRAPTOR) across CMRL, MTC and suburban rail.
+Usage: python journey_planner.py SCC SAP 08:00:00 [2026-10-19]
+
+Returns the Pareto-optimal journeys on arrival time, number of transfers and
+fare. Trips are grouped into stop patterns and scanned round by round (one
+round per ride); each stop keeps a bag of non-dominated labels, and labels
+are pruned against both the stop's best bag and the destination's bag. A
+backward pass over the fastest ride and walk times gives every stop a lower
+bound on the time left to the destination, so labels that cannot beat the
+destination bag, or the time horizon, are dropped early.
+
+Fares come from fare_attributes.txt/fare_rules.txt. A ticket bought on one
+system stays open for transfer_duration, so a second ride on the same
+system is priced origin-zone to final zone instead of as a new fare. Every
+system contributes its stops and walking links; rides come from the feeds
+that publish stop_times (today only CMRL - MTC has no stop_times and the
+suburban rail warehouse has no timetable).
+"""
+
+import heapq
+import math
+import sys
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from operator import itemgetter
+
+from gtfs_common import (GTFS_BASE, SR_GPKG, TRANSFER_SECS, StopRegistry, TripServices, format_time, haversine_m,
+                         load_sr_stops, parse_date, parse_time, read_csv, today)
+
+SYSTEMS = {
+    'CMRL': GTFS_BASE / "CMRL",
+    'MTC': GTFS_BASE / "MTC"
+}
+
+MAX_TRANSFERS = 4
+MAX_JOURNEY_MINUTES = 180  # labels arriving later than this are dropped
+EXPIRY_STEP_SECS = 600   # ticket expiry is rounded down to this step
+WALK_RADIUS_M = 400      # walking links between nearby stops of any system
+WALK_SPEED_MPS = 1.2
+GRID_DEG = 0.005
+
+
+class FareTable:
+    """Zone-to-zone fares of one system."""
+
+    def __init__(self, attributes, rules):
+        self.attributes = {}
+        for row in attributes:
+            try:
+                price = float(row.get('price', ''))
+            except ValueError:
+                continue
+            transfers = row.get('transfers', '')
+            self.attributes[row.get('fare_id', '')] = (
+                price,
+                int(transfers) if transfers.isdigit() else None,  # empty = unlimited
+                int(row['transfer_duration']) if (row.get('transfer_duration') or '').isdigit() else 0
+            )
+        self.rules = {}
+        for row in rules:
+            key = (row.get('route_id', ''), row.get('origin_id', ''), row.get('destination_id', ''))
+            if row.get('fare_id') in self.attributes:
+                self.rules[key] = row['fare_id']
+        self.zones = sorted({d for (_, _, d) in self.rules})
+        self.route_specific = any(route_id for (route_id, _, _) in self.rules)
+        self._cache = {}
+        self._gaps = {}
+
+    def lookup(self, route_id, origin_zone, destination_zone):
+        """(price, transfers, transfer_duration) or None when no rule applies."""
+        key = (route_id, origin_zone, destination_zone)
+        if key not in self._cache:
+            fare_id = self.rules.get(key) or self.rules.get(('', origin_zone, destination_zone))
+            self._cache[key] = self.attributes.get(fare_id) if fare_id else None
+        return self._cache[key]
+
+    def continuation_gap(self, origin_a, price_a, origin_b, price_b):
+        """Smallest saving of ticket a over ticket b on any continued ride.
+
+        A continued ride to zone z costs max(price, fare(origin, z)), so
+        ticket a (plus closed fare c_a) is never worse than ticket b (plus
+        c_b) when c_a - c_b <= this gap.
+        """
+        key = (origin_a, price_a, origin_b, price_b)
+        if key not in self._gaps:
+            gap = min(price_b - price_a, 0.0)  # destinations without a rule
+            if origin_a != origin_b:
+                if self.route_specific:
+                    gap = -math.inf
+                else:
+                    for zone in self.zones:
+                        fare_a = self.lookup('', origin_a, zone)
+                        fare_b = self.lookup('', origin_b, zone)
+                        gap = min(gap, max(price_b, fare_b[0] if fare_b else 0.0)
+                                  - max(price_a, fare_a[0] if fare_a else 0.0))
+            self._gaps[key] = gap
+        return self._gaps[key]
+
+
+class Pattern:
+    """Trips that serve the same stop sequence, sorted by departure."""
+
+    __slots__ = ('stops', 'zones', 'system', 'trips', 'route_ids', 'arrivals', 'departures')
+
+    def __init__(self, stops, system):
+        self.stops = stops
+        self.zones = ()
+        self.system = system
+        self.trips = []
+        self.route_ids = []
+        self.arrivals = []
+        self.departures = []
+
+
+class Label:
+    """A non-dominated way of reaching a stop.
+
+    ticket is None or (fares, origin_zone, expiry, price, transfers_left),
+    where fares is the FareTable of the system it was bought on; its price
+    is included in fare.
+    """
+
+    __slots__ = ('arrival', 'rides', 'fare', 'closed_fare', 'ticket', 'fare_known', 'parent')
+
+    def __init__(self, arrival, rides, closed_fare, ticket, fare_known, parent):
+        self.arrival = arrival
+        self.rides = rides
+        self.closed_fare = closed_fare
+        self.ticket = ticket
+        self.fare = closed_fare + (ticket[3] if ticket else 0)
+        self.fare_known = fare_known
+        self.parent = parent
+
+    def closed(self):
+        """The same label with its ticket closed (no further free transfers)."""
+        if self.ticket is None:
+            return self
+        return Label(self.arrival, self.rides, self.fare, None, self.fare_known, self.parent)
+
+    def dominates(self, other, ignore_ticket=False):
+        if self.arrival > other.arrival or self.rides > other.rides or self.fare > other.fare:
+            return False
+        # A ride without a fare rule adds nothing to fare, so an unpriced
+        # label's fare is only a lower bound and cannot beat a priced one
+        if other.fare_known and not self.fare_known:
+            return False
+        if ignore_ticket or other.ticket is None:
+            return True
+        # An open ticket can make later rides cheaper, so it is only covered
+        # by a ticket of the same system that lasts as long and is never
+        # worse on a continued ride
+        mine, theirs = self.ticket, other.ticket
+        if mine is None or mine[0] is not theirs[0] or mine[2] < theirs[2]:
+            return False
+        if mine[4] is not None and (theirs[4] is None or mine[4] < theirs[4]):
+            return False
+        gap = mine[0].continuation_gap(mine[1], mine[3], theirs[1], theirs[3])
+        return self.closed_fare - other.closed_fare <= gap
+
+
+def merge(bag, item, ignore_ticket=False, key=None):
+    """Add item to bag unless its label is dominated; drop items it dominates.
+
+    key maps bag items to labels when the bag holds more than labels.
+    Returns True if added.
+    """
+    if not bag:
+        bag.append(item)
+        return True
+    key = key or (lambda x: x)
+    label = key(item)
+    for existing in bag:
+        if key(existing).dominates(label, ignore_ticket):
+            return False
+    bag[:] = [existing for existing in bag if not label.dominates(key(existing), ignore_ticket)]
+    bag.append(item)
+    return True
+
+
+class JourneyNetwork(StopRegistry):
+    """Stops, stop patterns, walking links and fares of every system."""
+
+    def __init__(self):
+        super().__init__()
+        self.footpaths = defaultdict(list)
+        self.patterns = []
+        self.stop_patterns = defaultdict(list)
+        self.trip_info = []
+        self.services = TripServices()
+        self.fares = {}
+        self.reverse_edges = {}
+
+    def add_stops(self, system, stops):
+        """Register stops; stops of the same station are linked by transfers."""
+        added = super().add_stops(system, stops)
+        for idx, _ in added:
+            for sibling in self.siblings[idx]:
+                self.footpaths[idx].append((sibling, TRANSFER_SECS, True))
+        return added
+
+    def add_timetable(self, system, routes, trips, stop_times):
+        """Group trips into stop patterns."""
+        route_names = {r.get('route_id', ''): r.get('route_short_name', '') for r in routes}
+        trip_route = {t.get('trip_id', ''): t.get('route_id', '') for t in trips}
+        trip_service = {t.get('trip_id', ''): t.get('service_id', '') for t in trips}
+
+        by_trip = defaultdict(list)
+        for st in stop_times:
+            stop = self.stop_index.get(st.get('stop_id', ''))
+            trip_id = st.get('trip_id', '')
+            if stop is None or trip_id not in trip_route:
+                continue
+            try:
+                arrival = parse_time(st.get('arrival_time') or st.get('departure_time'))
+                departure = parse_time(st.get('departure_time') or st.get('arrival_time'))
+                seq = int(st.get('stop_sequence', ''))
+            except ValueError:
+                continue
+            by_trip[trip_id].append((seq, stop, arrival, departure))
+
+        patterns = {}
+        for trip_id, rows in by_trip.items():
+            rows.sort()
+            if len(rows) < 2:
+                continue
+            # Patterns never mix routes, since fare rules can be route-specific
+            route_id = trip_route[trip_id]
+            key = (route_id, tuple(stop for _, stop, _, _ in rows))
+            if key not in patterns:
+                patterns[key] = Pattern(key[1], system)
+            self.trip_info.append({'trip_id': trip_id, 'route_id': route_id,
+                                   'route_short_name': route_names.get(route_id, ''), 'system': system})
+            self.services.add_trip(system, trip_service[trip_id])
+            patterns[key].trips.append((rows[0][3], len(self.trip_info) - 1,
+                                        [a for _, _, a, _ in rows], [d for _, _, _, d in rows]))
+
+        for pattern in patterns.values():
+            # Trips of a pattern are assumed not to overtake one another
+            pattern.trips.sort()
+            pattern.arrivals = [list(col) for col in zip(*(t[2] for t in pattern.trips))]
+            pattern.departures = [list(col) for col in zip(*(t[3] for t in pattern.trips))]
+            pattern.trips = [t[1] for t in pattern.trips]
+            pattern.route_ids = [self.trip_info[t]['route_id'] for t in pattern.trips]
+            pattern.zones = tuple(self.stop_zone[stop] for stop in pattern.stops)
+            index = len(self.patterns)
+            self.patterns.append(pattern)
+            for position, stop in enumerate(pattern.stops):
+                self.stop_patterns[stop].append((index, position))
+        return len(patterns), len(by_trip)
+
+    def index_reverse_edges(self):
+        """Fastest ride or walk into each stop from each neighbour, for lower bounds."""
+        fastest = defaultdict(dict)
+        for pattern in self.patterns:
+            for i in range(len(pattern.stops) - 1):
+                secs = min(a - d for a, d in zip(pattern.arrivals[i + 1], pattern.departures[i]))
+                into = fastest[pattern.stops[i + 1]]
+                into[pattern.stops[i]] = min(into.get(pattern.stops[i], math.inf), max(0, secs))
+        for stop, links in self.footpaths.items():
+            for neighbour, secs, _ in links:
+                into = fastest[neighbour]
+                into[stop] = min(into.get(stop, math.inf), secs)
+        self.reverse_edges = {stop: list(into.items()) for stop, into in fastest.items()}
+
+    def lower_bounds(self, targets, limit):
+        """Minimum seconds from each stop to any target, ignoring waits; stops
+        that cannot reach a target within limit are left out."""
+        bounds = {}
+        heap = [(0, stop) for stop in targets]
+        while heap:
+            secs, stop = heapq.heappop(heap)
+            if stop in bounds:
+                continue
+            bounds[stop] = secs
+            for previous, edge in self.reverse_edges.get(stop, ()):
+                if previous not in bounds and secs + edge <= limit:
+                    heapq.heappush(heap, (secs + edge, previous))
+        return bounds
+
+    def add_walking_links(self, radius_m=WALK_RADIUS_M):
+        """Link stops of any system within radius_m of each other."""
+        grid = defaultdict(list)
+        for idx, coords in enumerate(self.stop_coords):
+            if coords:
+                grid[(int(coords[0] // GRID_DEG), int(coords[1] // GRID_DEG))].append(idx)
+        reach = int(math.ceil(radius_m / 111000 / GRID_DEG))
+        for (ci, cj), members in grid.items():
+            nearby = [n for di in range(-reach, reach + 1) for dj in range(-reach, reach + 1)
+                      for n in grid.get((ci + di, cj + dj), ())]
+            for a in members:
+                linked = {b for b, _, _ in self.footpaths[a]}
+                lat, lon = self.stop_coords[a]
+                for b in nearby:
+                    if b == a or b in linked:
+                        continue
+                    d = haversine_m(lat, lon, *self.stop_coords[b])
+                    if d <= radius_m:
+                        self.footpaths[a].append((b, max(60, int(d / WALK_SPEED_MPS)), False))
+
+
+def compile_journey_network(systems=SYSTEMS, sr_gpkg=SR_GPKG):
+    """Build the combined network used by plan_journeys."""
+    network = JourneyNetwork()
+    for system, gtfs_dir in systems.items():
+        if not gtfs_dir.exists():
+            continue
+        network.add_stops(system, read_csv(gtfs_dir / "stops.txt"))
+        network.fares[system] = FareTable(read_csv(gtfs_dir / "fare_attributes.txt"),
+                                          read_csv(gtfs_dir / "fare_rules.txt"))
+        stop_times = read_csv(gtfs_dir / "stop_times.txt")
+        if stop_times:
+            calendar = network.services.load_calendar(system, gtfs_dir)
+            if calendar and not calendar.covers(today()):
+                print(f"  ! {system}: calendar.txt does not cover {today()}, using its weekly pattern")
+            patterns, trips = network.add_timetable(
+                system, read_csv(gtfs_dir / "routes.txt"), read_csv(gtfs_dir / "trips.txt"), stop_times)
+            print(f"  {system}: {trips} trips in {patterns} patterns")
+        else:
+            print(f"  {system}: no stop_times, stops and walking links only")
+    sr_stops = load_sr_stops(sr_gpkg) if sr_gpkg else []
+    if sr_stops:
+        network.add_stops('SR', sr_stops)
+        print("  SR: no timetable, stops and walking links only")
+    network.add_walking_links()
+    network.aliases = dict(network.aliases)
+    network.footpaths = dict(network.footpaths)
+    network.stop_patterns = dict(network.stop_patterns)
+    network.index_reverse_edges()
+    return network
+
+
+def ride_label(network, parent, pattern, trip, board, alight, horizon, final=False):
+    """Label for riding trip from pattern stop board to pattern stop alight.
+
+    Ticket state is only kept while a later ride could still use it: the
+    ticket is closed on the last allowed ride and once its transfers run
+    out. Expiry is rounded down to EXPIRY_STEP_SECS and capped at the
+    search horizon so that tickets bought a few minutes apart compare equal;
+    rounding down can only overstate a fare, never offer an invalid transfer.
+    """
+    system = pattern.system
+    route_id = pattern.route_ids[trip]
+    board_time = pattern.departures[board][trip]
+    origin_zone = pattern.zones[board]
+    destination_zone = pattern.zones[alight]
+    fares = network.fares.get(system)
+    ticket = parent.ticket
+    fare_known = parent.fare_known
+
+    if ticket and ticket[0] is fares and board_time <= ticket[2]:
+        # Transfer within the open ticket: priced from the ticket's origin zone
+        fare = fares.lookup(route_id, ticket[1], destination_zone) if fares else None
+        price = max(ticket[3], fare[0]) if fare else ticket[3]
+        fare_known = fare_known and fare is not None
+        transfers_left = None if ticket[4] is None else ticket[4] - 1
+        new_ticket = (fares, ticket[1], ticket[2], price, transfers_left)
+        closed = parent.closed_fare
+    else:
+        closed = parent.closed_fare + (ticket[3] if ticket else 0)
+        fare = fares.lookup(route_id, origin_zone, destination_zone) if fares else None
+        if fare:
+            expiry = min((board_time + fare[2]) // EXPIRY_STEP_SECS * EXPIRY_STEP_SECS, horizon)
+            new_ticket = (fares, origin_zone, expiry, fare[0], fare[1])
+        else:
+            new_ticket = None
+            fare_known = False
+
+    label = Label(pattern.arrivals[alight][trip], parent.rides + 1, closed, new_ticket, fare_known,
+                  ('ride', parent, pattern, trip, board, alight))
+    if new_ticket and (final or new_ticket[4] == 0 or new_ticket[2] <= label.arrival):
+        return label.closed()
+    return label
+
+
+def plan_journeys(network, origin, destination, depart_at, max_transfers=MAX_TRANSFERS,
+                  max_minutes=MAX_JOURNEY_MINUTES, service_date=None):
+    """McRAPTOR search; returns the Pareto set of journeys at the destination.
+
+    Only trips whose service runs on service_date (default today) are used.
+    """
+    origins = network.resolve(origin)
+    targets = network.resolve(destination)
+    running = network.services.running(service_date)
+
+    best = defaultdict(list)       # stop -> bag over all rounds
+    target_bag = []
+    marked = set()
+
+    horizon = depart_at + max_minutes * 60
+    remaining = network.lower_bounds(targets, horizon - depart_at)
+
+    def beaten(stop, arrival, rides, fare, fare_known):
+        # Arrival, rides and fare never improve along a journey, so a label
+        # whose best case already loses to the destination bag is dropped
+        bound = remaining.get(stop)
+        if bound is None or arrival + bound > horizon:
+            return True
+        arrival += bound
+        return any(t.arrival <= arrival and t.rides <= rides and t.fare <= fare
+                   and (t.fare_known or not fare_known) for t in target_bag)
+
+    def improve(stop, label, current):
+        if beaten(stop, label.arrival, label.rides, label.fare, label.fare_known):
+            return False
+        if not merge(best[stop], label):
+            return False
+        current[stop].append(label)
+        if stop in targets:
+            merge(target_bag, label, ignore_ticket=True)
+        return True
+
+    previous = defaultdict(list)
+    for stop in origins:
+        label = Label(depart_at, 0, 0.0, None, True, None)
+        if improve(stop, label, previous):
+            marked.add(stop)
+    walk(network, previous, marked, improve)
+
+    for round_index in range(max_transfers + 1):
+        final = round_index == max_transfers
+        # Earliest marked position per pattern
+        queue = {}
+        for stop in marked:
+            for pattern_index, position in network.stop_patterns.get(stop, ()):
+                if position < queue.get(pattern_index, math.inf):
+                    queue[pattern_index] = position
+        if not queue:
+            break
+
+        current = defaultdict(list)
+        marked = set()
+        for pattern_index, start in queue.items():
+            pattern = network.patterns[pattern_index]
+            route_bag = []  # (parent label, trip, board position)
+            for position in range(start, len(pattern.stops)):
+                stop = pattern.stops[position]
+
+                if route_bag:
+                    # Carry the route bag to this stop, dropping entries whose
+                    # ride is dominated by another entry's ride or that can
+                    # no longer beat the destination
+                    arrivals = pattern.arrivals[position]
+                    rides = []
+                    for entry in route_bag:
+                        parent, trip, board = entry
+                        if beaten(stop, arrivals[trip], parent.rides + 1, parent.fare, parent.fare_known):
+                            continue
+                        label = ride_label(network, parent, pattern, trip, board, position, horizon, final)
+                        if len(route_bag) == 1:
+                            rides.append((label, entry))
+                        else:
+                            merge(rides, (label, entry), key=itemgetter(0))
+                    route_bag = [entry for _, entry in rides]
+                    for label, _ in rides:
+                        if improve(stop, label, current):
+                            marked.add(stop)
+
+                if position == len(pattern.stops) - 1:
+                    break
+                departures = pattern.departures[position]
+                for parent in previous.get(stop, ()):
+                    # Labels beaten later in their round need not board
+                    if parent not in best[stop]:
+                        continue
+                    trip = bisect_left(departures, parent.arrival)
+                    while trip < len(departures) and not running[pattern.trips[trip]]:
+                        trip += 1
+                    if trip < len(departures):
+                        route_bag.append((parent, trip, position))
+
+        walk(network, current, marked, improve)
+        previous = current
+
+    return [describe(network, label) for label in sorted(target_bag, key=lambda l: (l.arrival, l.rides, l.fare))]
+
+
+def walk(network, current, marked, improve):
+    """Relax walking links from the stops improved in this round.
+
+    Changing within a station keeps the ticket open; walking to another
+    station means leaving the system, which closes it.
+    """
+    for stop in list(marked):
+        for label in list(current.get(stop, ())):
+            if label.parent and label.parent[0] == 'walk':
+                continue
+            for neighbour, secs, same_station in network.footpaths.get(stop, ()):
+                base = label if same_station else label.closed()
+                walked = Label(label.arrival + secs, label.rides, base.closed_fare, base.ticket,
+                               label.fare_known, ('walk', label, stop, neighbour, secs))
+                if improve(neighbour, walked, current):
+                    marked.add(neighbour)
+
+
+def describe(network, label):
+    """Turn a destination label into a journey dict."""
+    legs = []
+    node = label
+    while node.parent:
+        kind = node.parent[0]
+        if kind == 'ride':
+            _, parent, pattern, trip, board, alight = node.parent
+            info = network.trip_info[pattern.trips[trip]]
+            legs.append({
+                'mode': 'ride',
+                'system': pattern.system,
+                'trip_id': info['trip_id'],
+                'route_id': info['route_id'],
+                'route_short_name': info['route_short_name'],
+                'from_stop': network.stop_ids[pattern.stops[board]],
+                'to_stop': network.stop_ids[pattern.stops[alight]],
+                'departure_time': format_time(pattern.departures[board][trip]),
+                'arrival_time': format_time(pattern.arrivals[alight][trip])
+            })
+        else:
+            _, parent, from_stop, to_stop, secs = node.parent
+            legs.append({
+                'mode': 'walk',
+                'from_stop': network.stop_ids[from_stop],
+                'to_stop': network.stop_ids[to_stop],
+                'duration_minutes': round(secs / 60, 1)
+            })
+        node = parent
+    legs.reverse()
+
+    rides = [leg for leg in legs if leg['mode'] == 'ride']
+    start = parse_time(rides[0]['departure_time']) if rides else node.arrival
+    return {
+        'departure_time': format_time(start),
+        'arrival_time': format_time(label.arrival),
+        'travel_time_minutes': round((label.arrival - start) / 60, 1),
+        'transfers': max(0, label.rides - 1),
+        'fare': round(label.fare, 2),
+        'fare_complete': label.fare_known,
+        'legs': legs
+    }
+
+
+def main():
+    """Plan journeys from the command line."""
+    if len(sys.argv) < 3:
+        print("Usage: python journey_planner.py ORIGIN DESTINATION [HH:MM:SS] [YYYY-MM-DD]")
+        sys.exit(1)
+    depart_at = parse_time(sys.argv[3]) if len(sys.argv) > 3 else 8 * 3600
+    service_date = parse_date(sys.argv[4]) if len(sys.argv) > 4 else today()
+
+    print("=" * 60)
+    print("Multi-criteria Journey Planner")
+    print("=" * 60)
+    network = compile_journey_network()
+
+    started = time.perf_counter()
+    try:
+        journeys = plan_journeys(network, sys.argv[1], sys.argv[2], depart_at, service_date=service_date)
+    except KeyError as e:
+        print(f"✗ {e.args[0]}")
+        sys.exit(1)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    print(f"\n✓ {len(journeys)} Pareto-optimal journeys on {service_date} in {elapsed:.1f} ms")
+    for journey in journeys:
+        print(f"\n  {journey['departure_time']} → {journey['arrival_time']} "
+              f"({journey['travel_time_minutes']} min, {journey['transfers']} transfers, ₹{journey['fare']:g})")
+        for leg in journey['legs']:
+            if leg['mode'] == 'ride':
+                print(f"    {leg['system']} {leg['route_short_name']}: {leg['from_stop']} {leg['departure_time']}"
+                      f" → {leg['to_stop']} {leg['arrival_time']}")
+            else:
+                print(f"    walk {leg['from_stop']} → {leg['to_stop']} ({leg['duration_minutes']} min)")
+
+
+if __name__ == "__main__":
+    main()
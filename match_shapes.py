@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Route-to-shape matching for GTFS feeds.
+
+Joins trips -> shapes -> routes to derive the route, colour and direction of
+every shape, and map-matches each trip's stops onto its shape to compute
+shape_dist_traveled (km). Lookups go through dict indexes built once per
+feed, and stops are projected onto all segments of a shape at once with
+numpy, so MTC-scale feeds match in seconds.
+"""
+
+import math
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from gtfs_common import read_csv
+
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_COLOR = "0054a6"
+
+# Stops further than this from a shape are not considered served by it
+MATCH_RADIUS_KM = 0.15
+
+
+def load_shape_points(shapes):
+    """Group shapes.txt rows into {shape_id: array of (lon, lat)} in sequence order."""
+    groups = defaultdict(list)
+    for shape in shapes:
+        shape_id = shape.get('shape_id', '').strip()
+        if not shape_id:
+            continue
+        try:
+            groups[shape_id].append((int(shape.get('shape_pt_sequence') or 0),
+                                     float(shape['shape_pt_lon']), float(shape['shape_pt_lat'])))
+        except (ValueError, KeyError):
+            continue
+
+    points = {}
+    for shape_id, rows in groups.items():
+        rows.sort(key=lambda r: r[0])
+        points[shape_id] = np.array([(lon, lat) for _, lon, lat in rows], dtype=np.float64)
+    return points
+
+
+def to_local_km(lonlat, lat0):
+    """Equirectangular projection to kilometres around latitude lat0."""
+    k = math.radians(1) * EARTH_RADIUS_KM
+    return np.column_stack([lonlat[:, 0] * k * math.cos(math.radians(lat0)), lonlat[:, 1] * k])
+
+
+def project_onto_shape(shape_xy, stop_xy, monotonic=True):
+    """Project stops onto a polyline.
+
+    Returns (measure_km, offset_km) per stop: the distance along the shape of
+    the nearest point and the distance from the stop to it. With monotonic,
+    each stop is matched at or beyond the previous stop's measure, so loops
+    and out-and-back shapes match in travel order.
+    """
+    a, b = shape_xy[:-1], shape_xy[1:]
+    seg = b - a
+    seg_len = np.hypot(seg[:, 0], seg[:, 1])
+    start_measure = np.concatenate([[0.0], np.cumsum(seg_len)])[:-1]
+    denom = np.where(seg_len > 0, seg_len ** 2, 1.0)
+
+    # stops x segments
+    rel = stop_xy[:, None, :] - a[None, :, :]
+    t = np.clip((rel * seg[None, :, :]).sum(axis=2) / denom, 0.0, 1.0)
+    nearest = a[None, :, :] + t[:, :, None] * seg[None, :, :]
+    dist = np.hypot(*(stop_xy[:, None, :] - nearest).transpose(2, 0, 1))
+    measure = start_measure[None, :] + t * seg_len[None, :]
+
+    if not monotonic:
+        best = dist.argmin(axis=1)
+        rows = np.arange(len(stop_xy))
+        return measure[rows, best], dist[rows, best]
+
+    measures = np.zeros(len(stop_xy))
+    offsets = np.zeros(len(stop_xy))
+    previous = 0.0
+    for i in range(len(stop_xy)):
+        candidate = np.where(measure[i] >= previous - 1e-9, dist[i], np.inf)
+        best = candidate.argmin()
+        if not np.isfinite(candidate[best]):
+            best = dist[i].argmin()
+        measures[i] = max(measure[i, best], previous)
+        offsets[i] = dist[i, best]
+        previous = measures[i]
+    return measures, offsets
+
+
+def shape_length_km(shape_xy):
+    """Length of a projected polyline."""
+    seg = np.diff(shape_xy, axis=0)
+    return float(np.hypot(seg[:, 0], seg[:, 1]).sum())
+
+
+def stops_near_shape(shape_xy, stop_ids, stop_xy, radius_km=MATCH_RADIUS_KM):
+    """Set of stop_ids within radius_km of a shape."""
+    lo = shape_xy.min(axis=0) - radius_km
+    hi = shape_xy.max(axis=0) + radius_km
+    inside = np.flatnonzero(((stop_xy >= lo) & (stop_xy <= hi)).all(axis=1))
+    if len(inside) == 0 or len(shape_xy) < 2:
+        return set()
+    _, offsets = project_onto_shape(shape_xy, stop_xy[inside], monotonic=False)
+    return {stop_ids[i] for i in inside[offsets <= radius_km]}
+
+
+def derive_shape_routes(trips, routes, shape_points=None, stops=None):
+    """Derive route, colour, direction and headsign for every shape from trips.txt.
+
+    Each shape takes the route that most of its trips run on. Shapes whose
+    route has no colour, or that no trip uses, borrow the colour of the
+    coloured shape serving the most stations in common (stations within
+    MATCH_RADIUS_KM of both shapes), when shape_points and stops are given.
+    """
+    route_index = {r.get('route_id', ''): r for r in routes}
+
+    trips_by_shape = defaultdict(list)
+    for trip in trips:
+        shape_id = trip.get('shape_id', '').strip()
+        if shape_id:
+            trips_by_shape[shape_id].append(trip)
+
+    info = {}
+    for shape_id, shape_trips in trips_by_shape.items():
+        route_id, trip_count = Counter(t.get('route_id', '') for t in shape_trips).most_common(1)[0]
+        route = route_index.get(route_id, {})
+        directions = Counter(t.get('direction_id') for t in shape_trips if t.get('direction_id'))
+        headsigns = Counter(t.get('trip_headsign') for t in shape_trips if t.get('trip_headsign'))
+        info[shape_id] = {
+            'route_id': route_id,
+            'route_short_name': route.get('route_short_name', ''),
+            'route_long_name': route.get('route_long_name', ''),
+            'color': route.get('route_color', ''),
+            'text_color': route.get('route_text_color', ''),
+            'direction_id': int(directions.most_common(1)[0][0]) if directions else None,
+            'headsign': headsigns.most_common(1)[0][0] if headsigns else '',
+            'trip_count': len(shape_trips),
+            'color_source': 'route' if route.get('route_color') else None
+        }
+
+    for shape_id in (shape_points or {}):
+        if shape_id not in info:
+            info[shape_id] = {
+                'route_id': None, 'route_short_name': '', 'route_long_name': '', 'color': '',
+                'text_color': '', 'direction_id': None, 'headsign': '', 'trip_count': 0,
+                'color_source': None
+            }
+
+    uncoloured = [s for s, i in info.items() if not i['color']]
+    if uncoloured and shape_points and stops:
+        _borrow_colours(info, uncoloured, shape_points, stops)
+
+    for shape_info in info.values():
+        if not shape_info['color']:
+            shape_info['color'] = DEFAULT_COLOR
+            shape_info['color_source'] = 'default'
+    return info
+
+
+def _borrow_colours(info, uncoloured, shape_points, stops):
+    """Give uncoloured shapes the colour of the coloured shape they overlap most."""
+    stop_ids, stop_lonlat = _stop_arrays(stops)
+    if not stop_ids:
+        return
+    lat0 = float(stop_lonlat[:, 1].mean())
+    stop_xy = to_local_km(stop_lonlat, lat0)
+
+    served = {}
+    for shape_id, pts in shape_points.items():
+        if shape_id in info and len(pts) >= 2:
+            served[shape_id] = _stations(stops_near_shape(to_local_km(pts, lat0), stop_ids, stop_xy), stops)
+
+    coloured = [s for s in served if info[s]['color']]
+    for shape_id in uncoloured:
+        mine = served.get(shape_id)
+        if not mine:
+            continue
+        donor = max(coloured, key=lambda s: len(mine & served[s]), default=None)
+        if donor and mine & served[donor]:
+            info[shape_id]['color'] = info[donor]['color']
+            info[shape_id]['color_source'] = f"overlap:{donor}"
+            if not info[shape_id]['route_long_name']:
+                info[shape_id]['route_long_name'] = info[donor]['route_long_name']
+
+
+def _stop_arrays(stops):
+    """stop_ids and an (n, 2) lon/lat array for stops with valid coordinates."""
+    stop_ids, coords = [], []
+    for stop in stops:
+        try:
+            lat, lon = float(stop['stop_lat']), float(stop['stop_lon'])
+        except (ValueError, KeyError, TypeError):
+            continue
+        if lat == 0 or lon == 0:
+            continue
+        stop_ids.append(stop.get('stop_id', ''))
+        coords.append((lon, lat))
+    return stop_ids, np.array(coords, dtype=np.float64).reshape(-1, 2)
+
+
+def _stations(stop_ids, stops):
+    """Collapse platform/entrance stop_ids to their parent stations."""
+    parents = {s.get('stop_id', ''): s.get('parent_station') or s.get('stop_id', '') for s in stops}
+    return {parents.get(stop_id, stop_id) for stop_id in stop_ids}
+
+
+def compute_shape_dist_traveled(trips, stop_times, stops, shape_points):
+    """Map-match every trip's stops onto its shape.
+
+    Returns {trip_id: {stop_sequence: shape_dist_traveled_km}}. Trips with the
+    same shape and stop pattern share one projection.
+    """
+    stop_ids, stop_lonlat = _stop_arrays(stops)
+    if not stop_ids or not shape_points:
+        return {}
+    stop_index = {stop_id: i for i, stop_id in enumerate(stop_ids)}
+    lat0 = float(stop_lonlat[:, 1].mean())
+    stop_xy = to_local_km(stop_lonlat, lat0)
+    shape_xy = {s: to_local_km(p, lat0) for s, p in shape_points.items() if len(p) >= 2}
+
+    trip_shape = {t.get('trip_id', ''): t.get('shape_id', '') for t in trips}
+    by_trip = defaultdict(list)
+    for st in stop_times:
+        trip_id = st.get('trip_id', '')
+        if trip_shape.get(trip_id) not in shape_xy:
+            continue
+        try:
+            by_trip[trip_id].append((int(st.get('stop_sequence', '')), st.get('stop_id', '')))
+        except ValueError:
+            continue
+
+    cache = {}
+    result = {}
+    for trip_id, rows in by_trip.items():
+        rows.sort()
+        rows = [(seq, stop_id) for seq, stop_id in rows if stop_id in stop_index]
+        if not rows:
+            continue
+        shape_id = trip_shape[trip_id]
+        pattern = (shape_id, tuple(stop_id for _, stop_id in rows))
+        if pattern not in cache:
+            idx = np.array([stop_index[stop_id] for _, stop_id in rows])
+            measures, _ = project_onto_shape(shape_xy[shape_id], stop_xy[idx])
+            cache[pattern] = [round(float(m), 3) for m in measures]
+        result[trip_id] = {seq: m for (seq, _), m in zip(rows, cache[pattern])}
+    return result
+
+
+def match_feed(gtfs_dir):
+    """Load a GTFS directory and return (shape_info, shape_points, trip_dists)."""
+    gtfs_dir = Path(gtfs_dir)
+    trips = read_csv(gtfs_dir / "trips.txt")
+    routes = read_csv(gtfs_dir / "routes.txt")
+    stops = read_csv(gtfs_dir / "stops.txt")
+    shape_points = load_shape_points(read_csv(gtfs_dir / "shapes.txt"))
+
+    shape_info = derive_shape_routes(trips, routes, shape_points, stops)
+    for shape_id, pts in shape_points.items():
+        if len(pts) >= 2:
+            shape_info[shape_id]['length_km'] = round(shape_length_km(to_local_km(pts, float(pts[:, 1].mean()))), 2)
+    trip_dists = compute_shape_dist_traveled(trips, read_csv(gtfs_dir / "stop_times.txt"), stops, shape_points)
+    return shape_info, shape_points, trip_dists
+
+
+if __name__ == "__main__":
+    cmrl = Path(__file__).parent / "GTFS" / "CMRL"
+    info, _, dists = match_feed(cmrl)
+    print("=" * 60)
+    print("CMRL shape matching")
+    print("=" * 60)
+    for shape_id, shape in sorted(info.items()):
+        print(f"  {shape_id}: route {shape['route_id']} #{shape['color']} "
+              f"({shape['color_source']}, {shape['trip_count']} trips, {shape.get('length_km')} km)")
+    print(f"✓ Matched stops for {len(dists)} trips")
@@ -0,0 +1,632 @@
+#!/usr/bin/env python3
+"""
+Async HTTP query service for travel times, nearest stops and departures.
+Usage: python query_server.py [--port 8000] [--workers 4] [--db]
+
+The network is compiled once at startup from the GTFS feeds and handed to a
+process pool; travel-time queries (connection scans) run there, and
+requests arriving within a few milliseconds of each other are batched into
+one worker call. Multi-criteria journey searches (journey_planner.py) run
+in the same pool, one query per call. Nearest-stop and departure lookups
+are cheap and answered on the event loop, or through a pooled PostGIS
+connection with --db.
+
+Timed queries take an optional date=YYYY-MM-DD (default today in Chennai);
+only trips whose service runs on that date are used.
+
+Endpoints:
+    GET  /health
+    GET  /api/stations
+    GET  /api/travel-time?origin=SCC&destination=SAP&time=08:00:00
+    GET  /api/nearest-stops?lat=13.08&lon=80.27&limit=5&radius_m=1000
+    GET  /api/departures?stop=SCC&time=08:00:00&limit=10
+    GET  /api/journeys?origin=STI&destination=SAP&time=08:00:00&max_transfers=4
+    POST /api/batch  {"queries": [{"type": "travel-time", "origin": ..., ...}, ...]}
+"""
+
+import argparse
+import asyncio
+import heapq
+import json
+import math
+import os
+import sys
+from bisect import bisect_left
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from gtfs_common import (GTFS_BASE, SR_GPKG, TIMEZONE, TRANSFER_SECS, StopRegistry, TripServices, format_time,
+                         haversine_m, load_sr_stops, parse_date, parse_time, read_csv, today)
+from journey_planner import MAX_TRANSFERS, compile_journey_network, plan_journeys
+
+SYSTEMS = {
+    'CMRL': GTFS_BASE / "CMRL",
+    'MTC': GTFS_BASE / "MTC"
+}
+
+GRID_DEG = 0.01            # nearest-stop grid cell (~1.1 km)
+BATCH_WINDOW_SECS = 0.005  # collect travel-time queries for this long
+MAX_BATCH = 64
+MAX_LIMIT = 100
+MAX_RADIUS_M = 5000
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+
+class QueryError(Exception):
+    """A query that cannot be answered; carries the HTTP status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+    def __reduce__(self):
+        # Errors travel back from worker processes, so keep them picklable
+        return (QueryError, (self.status, str(self)))
+
+
+class Network(StopRegistry):
+    """Compiled multi-system network held in memory by the server and workers.
+
+    Stops are indexed 0..n-1; connections (one per consecutive stop pair of
+    a trip) are sorted by departure for connection scans; each stop keeps
+    its sorted departures for departure boards.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.grid = defaultdict(list)
+        self.trip_ids = []
+        self.trip_info = []
+        self.services = TripServices()
+        self.connections = []
+        self.connection_deps = []
+        self.departures = defaultdict(list)
+
+    def add_stops(self, system, stops):
+        """Register stops and index them in the nearest-stop grid."""
+        added = super().add_stops(system, stops)
+        for idx, stop in added:
+            coords = self.stop_coords[idx]
+            if coords and stop.get('location_type', '0') in ('', '0'):
+                self.grid[(int(coords[0] // GRID_DEG), int(coords[1] // GRID_DEG))].append(idx)
+        return added
+
+    def resolve(self, key):
+        """Stop indexes for a stop_id, station id, station code or name."""
+        try:
+            return super().resolve(key)
+        except KeyError as e:
+            raise QueryError(404, e.args[0])
+
+    def finalize(self):
+        """Sort connections and departures once everything is loaded."""
+        self.connections.sort()
+        self.connection_deps = [c[0] for c in self.connections]
+        for stop_departures in self.departures.values():
+            stop_departures.sort()
+        self.departures = dict(self.departures)
+        self.aliases = dict(self.aliases)
+        self.grid = dict(self.grid)
+
+
+def compile_network(systems=SYSTEMS, sr_gpkg=SR_GPKG):
+    """Build a Network from every system; trips come from those with stop_times."""
+    network = Network()
+    for system, gtfs_dir in systems.items():
+        stop_times = read_csv(gtfs_dir / "stop_times.txt")
+        stops = read_csv(gtfs_dir / "stops.txt")
+        network.add_stops(system, stops)
+        if not stop_times:
+            print(f"  {system}: {len(stops)} stops, no stop_times (nearest-stop queries only)")
+            continue
+
+        calendar = network.services.load_calendar(system, gtfs_dir)
+        if calendar and not calendar.covers(today()):
+            print(f"  ! {system}: calendar.txt does not cover {today()}, using its weekly pattern")
+        routes = {r.get('route_id', ''): r for r in read_csv(gtfs_dir / "routes.txt")}
+        trip_codes = {}
+        for trip in read_csv(gtfs_dir / "trips.txt"):
+            trip_id = trip.get('trip_id', '')
+            if not trip_id:
+                continue
+            route = routes.get(trip.get('route_id', ''), {})
+            trip_codes[trip_id] = len(network.trip_ids)
+            network.trip_ids.append(trip_id)
+            network.services.add_trip(system, trip.get('service_id', ''))
+            network.trip_info.append({
+                'trip_id': trip_id,
+                'route_id': trip.get('route_id', ''),
+                'route_short_name': route.get('route_short_name', ''),
+                'headsign': trip.get('trip_headsign', ''),
+                'system': system
+            })
+
+        by_trip = defaultdict(list)
+        for st in stop_times:
+            trip = trip_codes.get(st.get('trip_id', ''))
+            stop = network.stop_index.get(st.get('stop_id', ''))
+            if trip is None or stop is None:
+                continue
+            try:
+                arrival = parse_time(st.get('arrival_time') or st.get('departure_time'))
+                departure = parse_time(st.get('departure_time') or st.get('arrival_time'))
+                seq = int(st.get('stop_sequence', ''))
+            except ValueError:
+                continue
+            by_trip[trip].append((seq, stop, arrival, departure))
+
+        count = 0
+        for trip, rows in by_trip.items():
+            rows.sort()
+            for (_, from_stop, _, dep), (_, to_stop, arr, _) in zip(rows, rows[1:]):
+                if arr >= dep:
+                    network.connections.append((dep, arr, from_stop, to_stop, trip))
+                    count += 1
+            for _, stop, _, dep in rows[:-1]:
+                network.departures[stop].append((dep, trip))
+        print(f"  {system}: {len(stops)} stops, {len(by_trip)} trips, {count} connections")
+
+    sr_stops = load_sr_stops(sr_gpkg) if sr_gpkg else []
+    if sr_stops:
+        network.add_stops('SR', sr_stops)
+        print(f"  SR: {len(sr_stops)} stations, no timetable (nearest-stop queries only)")
+
+    network.finalize()
+    return network
+
+
+def earliest_arrival(network, origin, destination, depart_at, service_date=None):
+    """Connection scan for the earliest arrival, with same-station transfers.
+
+    Only trips whose service runs on service_date (default today) are used.
+    """
+    origins = network.resolve(origin)
+    targets = network.resolve(destination)
+    running = network.services.running(service_date)
+
+    earliest = {}
+    for s in origins:
+        earliest[s] = depart_at
+    boarded = {}
+    reached_by = {}
+    best = math.inf
+    inf = math.inf
+
+    conns = network.connections
+    for i in range(bisect_left(network.connection_deps, depart_at), len(conns)):
+        dep, arr, from_stop, to_stop, trip = conns[i]
+        if dep >= best:
+            break
+        if trip not in boarded:
+            if earliest.get(from_stop, inf) > dep or not running[trip]:
+                continue
+            boarded[trip] = i
+        if arr < earliest.get(to_stop, inf):
+            earliest[to_stop] = arr
+            reached_by[to_stop] = ('ride', boarded[trip], i)
+            if to_stop in targets:
+                best = min(best, arr)
+            for sibling in network.siblings.get(to_stop, ()):
+                if arr + TRANSFER_SECS < earliest.get(sibling, inf):
+                    earliest[sibling] = arr + TRANSFER_SECS
+                    reached_by[sibling] = ('transfer', to_stop)
+                    if sibling in targets:
+                        best = min(best, arr + TRANSFER_SECS)
+
+    if best == inf:
+        return None
+
+    target = min((s for s in targets if s in earliest), key=lambda s: earliest[s])
+    legs = []
+    stop = target
+    while stop not in origins and stop in reached_by:
+        step = reached_by[stop]
+        if step[0] == 'transfer':
+            stop = step[1]
+            continue
+        _, board_i, alight_i = step
+        board, alight = conns[board_i], conns[alight_i]
+        info = network.trip_info[board[4]]
+        legs.append({
+            'trip_id': info['trip_id'],
+            'route_id': info['route_id'],
+            'route_short_name': info['route_short_name'],
+            'system': info['system'],
+            'from_stop': network.stop_ids[board[2]],
+            'to_stop': network.stop_ids[alight[3]],
+            'departure_time': format_time(board[0]),
+            'arrival_time': format_time(alight[1])
+        })
+        stop = board[2]
+    legs.reverse()
+
+    first_departure = parse_time(legs[0]['departure_time']) if legs else depart_at
+    return {
+        'origin': origin,
+        'destination': destination,
+        'departure_time': format_time(first_departure),
+        'arrival_time': format_time(earliest[target]),
+        'travel_time_minutes': round((earliest[target] - first_departure) / 60, 1),
+        'transfers': max(0, len(legs) - 1),
+        'legs': legs
+    }
+
+
+def nearest_stops(network, lat, lon, limit=5, radius_m=1000):
+    """Stops within radius_m of a point, closest first, from the grid index."""
+    reach = int(math.ceil(radius_m / 111000 / GRID_DEG)) + 1
+    cell_lat, cell_lon = int(lat // GRID_DEG), int(lon // GRID_DEG)
+    found = []
+    for i in range(cell_lat - reach, cell_lat + reach + 1):
+        for j in range(cell_lon - reach, cell_lon + reach + 1):
+            for idx in network.grid.get((i, j), ()):
+                s_lat, s_lon = network.stop_coords[idx]
+                d = haversine_m(lat, lon, s_lat, s_lon)
+                if d <= radius_m:
+                    found.append((d, idx))
+    return [{
+        'stop_id': network.stop_ids[idx],
+        'stop_name': network.stop_names[idx],
+        'system': network.stop_system[idx],
+        'lat': network.stop_coords[idx][0],
+        'lon': network.stop_coords[idx][1],
+        'distance_m': round(d, 1)
+    } for d, idx in heapq.nsmallest(limit, found)]
+
+
+def next_departures(network, stop, depart_at, limit=10, service_date=None):
+    """Next departures from every stop of a station on service_date, merged in time order."""
+    running = network.services.running(service_date)
+    streams = []
+    for idx in network.resolve(stop):
+        deps = network.departures.get(idx, [])
+        start = bisect_left(deps, (depart_at, -1))
+        streams.append(((dep, trip, idx) for dep, trip in deps[start:]))
+    result = []
+    for dep, trip, idx in heapq.merge(*streams):
+        if not running[trip]:
+            continue
+        info = network.trip_info[trip]
+        result.append({
+            'departure_time': format_time(dep),
+            'stop_id': network.stop_ids[idx],
+            'trip_id': info['trip_id'],
+            'route_id': info['route_id'],
+            'route_short_name': info['route_short_name'],
+            'headsign': info['headsign'],
+            'system': info['system']
+        })
+        if len(result) >= limit:
+            break
+    return result
+
+
+# Process pool workers keep their own copy of the networks
+_WORKER_NETWORK = None
+_WORKER_JOURNEY_NETWORK = None
+
+
+def _init_worker(network, journey_network=None):
+    global _WORKER_NETWORK, _WORKER_JOURNEY_NETWORK
+    _WORKER_NETWORK = network
+    _WORKER_JOURNEY_NETWORK = journey_network
+
+
+def solve_travel_times(queries):
+    """Answer a batch of (origin, destination, depart_at, service_date) queries in a worker."""
+    results = []
+    for origin, destination, depart_at, service_date in queries:
+        try:
+            journey = earliest_arrival(_WORKER_NETWORK, origin, destination, depart_at, service_date)
+            results.append(journey if journey else QueryError(404, "No journey found"))
+        except QueryError as e:
+            results.append(e)
+    return results
+
+
+def solve_journeys(origin, destination, depart_at, max_transfers, service_date):
+    """Pareto-optimal journeys (time, transfers, fare) in a worker."""
+    if _WORKER_JOURNEY_NETWORK is None:
+        raise QueryError(404, "Journey planning is not enabled")
+    try:
+        journeys = plan_journeys(_WORKER_JOURNEY_NETWORK, origin, destination, depart_at, max_transfers,
+                                 service_date=service_date)
+    except KeyError as e:
+        raise QueryError(404, e.args[0])
+    if not journeys:
+        raise QueryError(404, "No journey found")
+    return journeys
+
+
+class TravelTimeBatcher:
+    """Coalesce travel-time queries that arrive close together into one worker call."""
+
+    def __init__(self, pool, window=BATCH_WINDOW_SECS, max_batch=MAX_BATCH):
+        self.pool = pool
+        self.window = window
+        self.max_batch = max_batch
+        self.pending = []
+        self.timer = None
+
+    async def submit(self, origin, destination, depart_at, service_date):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append(((origin, destination, depart_at, service_date), future))
+        if len(self.pending) >= self.max_batch:
+            self._flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.window, self._flush)
+        result = await future
+        if isinstance(result, QueryError):
+            raise result
+        return result
+
+    def _flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        loop = asyncio.get_running_loop()
+        task = loop.run_in_executor(self.pool, solve_travel_times, [q for q, _ in batch])
+
+        def resolve(done):
+            try:
+                results = done.result()
+            except Exception as e:
+                results = [e] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception) and not isinstance(result, QueryError):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+        task.add_done_callback(resolve)
+
+
+class PostgisNearest:
+    """Nearest-stop lookups through a pooled PostGIS connection."""
+
+    def __init__(self, db_config, max_connections=8):
+        from psycopg2.pool import ThreadedConnectionPool
+        self.pool = ThreadedConnectionPool(1, max_connections, **db_config)
+        self.executor = ThreadPoolExecutor(max_workers=max_connections)
+
+    def _query(self, lat, lon, limit, radius_m):
+        conn = self.pool.getconn()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT stop_id, stop_name, system, stop_lat, stop_lon,
+                       ST_Distance(geom::geography, ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography) AS d
+                FROM stops
+                WHERE ST_DWithin(geom::geography, ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography, %s)
+                ORDER BY geom <-> ST_SetSRID(ST_MakePoint(%s, %s), 4326)
+                LIMIT %s
+            """, (lon, lat, lon, lat, radius_m, lon, lat, limit))
+            rows = cursor.fetchall()
+        finally:
+            self.pool.putconn(conn)
+        return [{'stop_id': r[0], 'stop_name': r[1], 'system': r[2], 'lat': float(r[3]),
+                 'lon': float(r[4]), 'distance_m': round(r[5], 1)} for r in rows]
+
+    async def query(self, lat, lon, limit, radius_m):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._query, lat, lon, limit, radius_m)
+
+    def close(self):
+        self.executor.shutdown()
+        self.pool.closeall()
+
+
+class QueryServer:
+    """HTTP/1.1 keep-alive server over asyncio streams."""
+
+    def __init__(self, network, batcher, postgis=None):
+        self.network = network
+        self.batcher = batcher
+        self.postgis = postgis
+        self.pool = batcher.pool
+
+    @staticmethod
+    def _param(params, name, default=None, cast=str, valid=None):
+        value = params.get(name, default)
+        if value is None:
+            raise QueryError(400, f"Missing parameter: {name}")
+        try:
+            # Batch queries are JSON, so values may arrive as numbers
+            result = cast(str(value))
+        except (TypeError, ValueError):
+            raise QueryError(400, f"Invalid value for {name}: {value}")
+        if valid and not valid(result):
+            raise QueryError(400, f"Invalid value for {name}: {value}")
+        return result
+
+    def _when(self, params):
+        """(service_date, seconds since midnight) from date/time parameters, defaulting to now in Chennai."""
+        now = datetime.now(TIMEZONE)
+        service_date = self._param(params, 'date', None, parse_date) if 'date' in params else now.date()
+        if 'time' in params:
+            return service_date, self._param(params, 'time', None, parse_time, lambda v: v >= 0)
+        return service_date, now.hour * 3600 + now.minute * 60 + now.second
+
+    async def answer(self, kind, params):
+        """Dispatch one query by type; used by GET endpoints and /api/batch."""
+        if kind == 'travel-time':
+            origin = self._param(params, 'origin')
+            destination = self._param(params, 'destination')
+            service_date, depart_at = self._when(params)
+            return await self.batcher.submit(origin, destination, depart_at, service_date)
+        if kind == 'nearest-stops':
+            lat = self._param(params, 'lat', cast=float, valid=lambda v: -90 <= v <= 90)
+            lon = self._param(params, 'lon', cast=float, valid=lambda v: -180 <= v <= 180)
+            limit = min(self._param(params, 'limit', 5, int, lambda v: v >= 1), MAX_LIMIT)
+            radius_m = self._param(params, 'radius_m', 1000, float, lambda v: 0 < v <= MAX_RADIUS_M)
+            if self.postgis:
+                return await self.postgis.query(lat, lon, limit, radius_m)
+            return nearest_stops(self.network, lat, lon, limit, radius_m)
+        if kind == 'departures':
+            stop = self._param(params, 'stop')
+            service_date, depart_at = self._when(params)
+            limit = min(self._param(params, 'limit', 10, int, lambda v: v >= 1), MAX_LIMIT)
+            return next_departures(self.network, stop, depart_at, limit, service_date)
+        if kind == 'journeys':
+            origin = self._param(params, 'origin')
+            destination = self._param(params, 'destination')
+            service_date, depart_at = self._when(params)
+            max_transfers = min(self._param(params, 'max_transfers', MAX_TRANSFERS, int, lambda v: v >= 0),
+                                MAX_TRANSFERS)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.pool, solve_journeys, origin, destination, depart_at,
+                                              max_transfers, service_date)
+        raise QueryError(404, f"Unknown query type: {kind}")
+
+    async def batch(self, body):
+        """Run many queries concurrently; travel-time ones share worker batches."""
+        try:
+            queries = json.loads(body or b'{}').get('queries', [])
+        except (ValueError, AttributeError):
+            raise QueryError(400, "Body must be JSON: {\"queries\": [...]}")
+
+        if not isinstance(queries, list):
+            raise QueryError(400, "Body must be JSON: {\"queries\": [...]}")
+
+        async def one(query):
+            # Each query fails on its own without failing the batch
+            try:
+                if not isinstance(query, dict):
+                    raise QueryError(400, "Each query must be a JSON object")
+                return {'result': await self.answer(query.get('type', ''), query)}
+            except QueryError as e:
+                return {'error': str(e), 'status': e.status}
+            except Exception as e:
+                return {'error': f"{type(e).__name__}: {e}", 'status': 500}
+
+        return {'results': await asyncio.gather(*(one(q) for q in queries))}
+
+    async def route(self, method, target, body):
+        url = urlsplit(target)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        path = url.path.rstrip('/') or '/'
+
+        if path == '/health':
+            return {'status': 'ok', 'stops': len(self.network.stop_ids),
+                    'connections': len(self.network.connections)}
+        if path == '/api/batch':
+            if method != 'POST':
+                raise QueryError(405, "Use POST")
+            return await self.batch(body)
+        if path == '/api/stations':
+            stations = {}
+            for idx, coords in enumerate(self.network.stop_coords):
+                if coords and idx in self.network.departures:
+                    stations[self.network.stop_ids[idx]] = {
+                        'stop_name': self.network.stop_names[idx], 'system': self.network.stop_system[idx],
+                        'lat': coords[0], 'lon': coords[1]}
+            return stations
+        if path.startswith('/api/') and method == 'GET':
+            return await self.answer(path[len('/api/'):], params)
+        raise QueryError(404, f"Not found: {path}")
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length') or 0))
+
+                try:
+                    status, payload = 200, await self.route(method, target, body)
+                except QueryError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except Exception as e:
+                    status, payload = 500, {'error': f"{type(e).__name__}: {e}"}
+
+                data = json.dumps(payload).encode('utf-8')
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Access-Control-Allow-Origin: *\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(args):
+    """Compile the network, start the worker pool and serve until cancelled."""
+    print("Compiling network...")
+    network = compile_network()
+    print(f"✓ {len(network.stop_ids)} stops, {len(network.connections)} connections")
+    journey_network = None
+    if not args.no_journeys:
+        journey_network = compile_journey_network()
+        print(f"✓ Journey planner: {len(journey_network.patterns)} stop patterns")
+
+    pool = ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                               initargs=(network, journey_network))
+    postgis = None
+    if args.db:
+        sys.path.insert(0, str(Path(__file__).parent / "database"))
+        from gtfs_to_postgis import DB_CONFIG
+        postgis = PostgisNearest(DB_CONFIG, args.db_connections)
+        print(f"✓ PostGIS pool: {args.db_connections} connections to {DB_CONFIG['dbname']}")
+
+    server = QueryServer(network, TravelTimeBatcher(pool), postgis)
+    http = await asyncio.start_server(server.handle, args.host, args.port, backlog=1024)
+    print(f"✓ Listening on http://{args.host}:{args.port} ({args.workers} workers)")
+    try:
+        async with http:
+            await http.serve_forever()
+    finally:
+        pool.shutdown(cancel_futures=True)
+        if postgis:
+            postgis.close()
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Transit query service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--db', action='store_true', help="Serve nearest stops from PostGIS")
+    parser.add_argument('--db-connections', type=int, default=8)
+    parser.add_argument('--no-journeys', action='store_true', help="Skip compiling the multi-criteria journey planner")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Transit Query Service")
+    print("=" * 60)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\n✓ Stopped")
+
+
+if __name__ == "__main__":
+    main()